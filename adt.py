@@ -1,8 +1,11 @@
 '''Abstract data types (adt) to represent a regular expression as an abstract syntax tree (ast)'''
+import stats
+import sys
 from abc import ABC, abstractmethod
-from utils import SingletonMixin, ValueEqualityMixin, raise_if_not
+from bisect import bisect_right
+from utils import HashConsMixin, raise_if_not
 
-class Regex(ABC, ValueEqualityMixin):
+class Regex(ABC, HashConsMixin):
     @abstractmethod
     def matches_empty_str(self):
         '''Returns Epsilon() if this Regex matches an empty string, otherwise returns NullRegex()'''
@@ -26,32 +29,73 @@ class Regex(ABC, ValueEqualityMixin):
         '''Convert to a regular expression'''
         pass
 
+    def _sort_key(self):
+        '''
+        A key ordering Regexes by their structure, so the operands of an Or sort into the same order however it was
+        built. Computed once per instance, without recursion, as a regex can be nested deeper than the recursion limit.
+        '''
+        to_visit = [self]
+        while to_visit:
+            regex = to_visit[-1]
+            fields = [value for name, value in regex.__dict__.items() if not name.startswith('_')]
+            unkeyed = [value for value in fields if isinstance(value, Regex) and '_key' not in value.__dict__]
+            if unkeyed:
+                to_visit += unkeyed
+                continue
+            to_visit.pop()
+            regex._key = (type(regex).__name__,) + tuple(value._key if isinstance(value, Regex) else
+                -1 if value is None else value for value in fields)
+        return self._key
+
     def matches(self, s):
-        if s:
-            return self.derivative(s[0]).matches(s[1:])
-        return self.matches_empty_str() == Epsilon()
+        stats.add('derivative_calls', len(s))
+        regex = self
+        for char in s:
+            regex = regex.derivative(char)
+        return regex.matches_empty_str() == Epsilon()
 
 class Or(Regex):
     def __new__(cls, regex_a, regex_b):
-        if regex_a == NullRegex():
+        # Compared by type, as NullRegex() and Epsilon() are lookups in the table of interned instances
+        if type(regex_a) == NullRegex:
             return regex_b
-        if regex_b == NullRegex():
+        if type(regex_b) == NullRegex:
             return regex_a
-        if regex_a == regex_b:
+        if regex_a is regex_b:
             return regex_a
 
-        self = super().__new__(cls)
-        self.regex_a = regex_a
-        self.regex_b = regex_b
-        return self      
+        return cls.from_regexes((regex_a, regex_b))
+
+    @classmethod
+    def from_regexes(cls, regexes):
+        '''
+        The Or of every one of regexes, at least one. Ors of the same operands, however nested and in whatever order,
+        are built the same way, so are the same instance. Otherwise the derivatives of a regex like (a|b)*a(a|b)*
+        would be ever new Ors, and DerivativeDFA would never stop adding states.
+        '''
+        operands = dict.fromkeys(operand for regex in regexes if type(regex) != NullRegex
+            for operand in _or_operands(regex))
+        if not operands:
+            return NullRegex()
+        return cls._balanced(sorted(operands, key=Regex._sort_key))
+
+    @classmethod
+    def _balanced(cls, operands):
+        '''A balanced tree of Ors of operands, at least one sorted, distinct Regex that isn't an Or'''
+        if len(operands) == 1:
+            return operands[0]
+        middle = len(operands) // 2
+        # The operands are interned with the Or, so an Or is never seen without them by another thread
+        return cls._intern(regex_a=cls._balanced(operands[:middle]), regex_b=cls._balanced(operands[middle:]),
+            _operands=tuple(operands))
 
     def matches_empty_str(self):
         '''δ(re1 | re2) = δ(re1) | δ(re2)'''
         return Or(self.regex_a.matches_empty_str(), self.regex_b.matches_empty_str())
 
     def derivative(self, char):
-        '''Dc(re1 | re2) = Dc(re1) | Dc(re2)'''
-        return Or(self.regex_a.derivative(char), self.regex_b.derivative(char))
+        '''Dc(re1 | re2) = Dc(re1) | Dc(re2), normalized once over every operand rather than at each nested Or'''
+        return Or.from_regexes([operand.derivative(char) for operand in self._operands])
 
     def to_str_english(self):
         return '{0} or {1}'.format(self.regex_a.to_str_english(), self.regex_b.to_str_english())
@@ -61,26 +105,38 @@ class Or(Regex):
             return '{0}|{1}'.format(self.regex_a.to_regex(), self.regex_b.to_regex())     
         return '({0}|{1})'.format(self.regex_a.to_regex(), self.regex_b.to_regex())        
 
+def _or_operands(regex):
+    '''The Regexes regex is an Or of, or just regex if it isn't one'''
+    return regex._operands if type(regex) == Or else (regex,)
+
 class Sequence(Regex):
     def __new__(cls, regex_a, regex_b):
-        if NullRegex() in (regex_a, regex_b):
-            return NullRegex()
-        if regex_a == Epsilon():
+        if type(regex_a) == NullRegex:
+            return regex_a
+        if type(regex_b) == NullRegex:
             return regex_b
-        if regex_b == Epsilon():
+        if type(regex_a) == Epsilon:
+            return regex_b
+        if type(regex_b) == Epsilon:
             return regex_a
 
-        self = super().__new__(cls)
-        self.regex_a = regex_a
-        self.regex_b = regex_b    
-        return self      
+        return cls._intern(regex_a=regex_a, regex_b=regex_b)
 
     def matches_empty_str(self):
         '''δ(re1 re2) = δ(re1) δ(re2)'''
         return Sequence(self.regex_a.matches_empty_str(), self.regex_b.matches_empty_str())
 
+    def matches(self, s):
+        # A literal prefix is compared all at once, rather than taking a derivative per char
+        if type(self.regex_a) == Literal:
+            prefix = self.regex_a.rest
+            return s.startswith(prefix) and self.regex_b.matches(s[len(prefix):])
+        return super().matches(s)
+
     def derivative(self, char):
         '''Dc(re1 re2) = δ(re1) Dc(re2) | Dc(re1) re2'''
+        if type(self.regex_a.matches_empty_str()) == NullRegex: # δ(re1) Dc(re2) = ∅, so Dc(re2) isn't needed
+            return Sequence(self.regex_a.derivative(char), self.regex_b)
         return Or(
             Sequence(self.regex_a.matches_empty_str(), self.regex_b.derivative(char)),
             Sequence(self.regex_a.derivative(char), self.regex_b)
@@ -107,9 +163,7 @@ class ZeroOrMore(Regex):
         if type(regex) == Optional:
             regex = regex.regex
 
-        self = super().__new__(cls)
-        self.regex = regex
-        return self      
+        return cls._intern(regex=regex)
 
     def matches_empty_str(self):
         '''δ(re*) = ε'''
@@ -136,9 +190,7 @@ class Optional(Regex):
         if type(regex) == ZeroOrMore:
             return regex
 
-        self = super().__new__(cls)
-        self.regex = regex
-        return self    
+        return cls._intern(regex=regex)
 
     def matches_empty_str(self):
         '''δ(re?) = ε'''
@@ -156,10 +208,69 @@ class Optional(Regex):
             return '{0}?'.format(self.regex.to_regex())
         return '({0})?'.format(self.regex.to_regex())        
 
+class Repeat(Regex):
+    '''regex repeated from min to max times, or at least min times if max is None'''
+    def __new__(cls, regex, min, max):
+        raise_if_not(min >= 0 and (max is None or min <= max), 'Invalid Repeat bounds: {{{0},{1}}}'.format(min, max))
+        if regex == Epsilon() or max == 0:
+            return Epsilon()
+        if regex == NullRegex():
+            return Epsilon() if min == 0 else NullRegex()
+        if type(regex) == ZeroOrMore:
+            return regex
+        if type(regex) == Optional: # each copy can be empty, so re?{m,n} = re{0,n}
+            return Repeat(regex.regex, 0, max)
+        if (min, max) == (1, 1):
+            return regex
+        if (min, max) == (0, 1):
+            return Optional(regex)
+        if (min, max) == (0, None):
+            return ZeroOrMore(regex)
+        if (min, max) == (1, None):
+            return Sequence(regex, ZeroOrMore(regex))
+
+        return cls._intern(regex=regex, min=min, max=max)
+
+    def matches_empty_str(self):
+        '''
+        δ(re{0,n}) = ε
+        δ(re{m,n}) = δ(re)
+        '''
+        return Epsilon() if self.min == 0 else self.regex.matches_empty_str()
+
+    def derivative(self, char):
+        '''Dc(re{m,n}) = Dc(re) re{m-1,n-1}, where m-1 is no less than 0, and n-1 is unbounded if n is'''
+        return Sequence(self.regex.derivative(char), 
+            Repeat(self.regex, max(self.min - 1, 0), None if self.max is None else self.max - 1))
+
+    def _bounds_str(self):
+        if self.min == self.max:
+            return str(self.min)
+        return '{0},{1}'.format(self.min, '' if self.max is None else self.max)
+
+    def to_str_english(self):
+        if self.min == self.max:
+            times = '{0} times'.format(self.min)
+        elif self.max is None:
+            times = 'at least {0} times'.format(self.min)
+        else:
+            times = '{0} to {1} times'.format(self.min, self.max)
+        return '({0} {1})'.format(self.regex.to_str_english(), times)
+
+    def to_regex(self):
+        if type(self.regex) in _do_not_need_brackets:
+            return '{0}{{{1}}}'.format(self.regex.to_regex(), self._bounds_str())
+        return '({0}){{{1}}}'.format(self.regex.to_regex(), self._bounds_str())
+
 class Char(Regex):
-    def __init__(self, char):
+    def __new__(cls, char):
         raise_if_not(len(char) == 1, 'char must be a string of length 1, got: {0}'.format(char))
-        self.char = char
+        return cls._intern(char=char)
+
+    @property
+    def ranges(self):
+        '''The code point ranges of the char, as for CharClass'''
+        return ((ord(self.char), ord(self.char)),)
 
     def matches_empty_str(self):
         '''δ(c) = ∅'''
@@ -176,11 +287,51 @@ class Char(Regex):
         return self.char
 
     def to_regex(self):
-        if self.char in ('(', ')', '\\', '.', '|', '*', '+', '[', ']', '{', '}'):
-            return '\{0}'.format(self.char)
-        return self.char
+        return _escape(self.char)
+
+class Literal(Regex):
+    '''
+    The string text from offset onwards. A derivative moves offset on by one rather than copying text, so it takes
+    constant time however long the literal is.
+    '''
+    def __new__(cls, text, offset=0):
+        raise_if_not(0 <= offset <= len(text), 'offset must be within text, got: {0}'.format(offset))
+        if offset == len(text):
+            return Epsilon()
+        if offset == len(text) - 1:
+            return Char(text[offset])
+        return cls._intern(text=text, offset=offset)
+
+    @property
+    def rest(self):
+        '''The chars left to match'''
+        return self.text[self.offset:]
+
+    def matches(self, s):
+        return s == self.rest
+
+    def matches_empty_str(self):
+        '''δ(s) = ∅, as s has at least two chars'''
+        return NullRegex()
+
+    def derivative(self, char):
+        '''
+        Dc(cs) = s
+        Dc(c's) = ∅ if c ≠ c'
+        '''
+        if char == self.text[self.offset]:
+            return Literal(self.text, self.offset + 1)
+        return NullRegex()
+
+    def to_str_english(self):
+        return self.rest
+
+    def to_regex(self):
+        return ''.join(map(_escape, self.rest))
+
+class AnyChar(Regex):
+    ranges = ((0, sys.maxunicode),) # as for CharClass
 
-class AnyChar(Regex, SingletonMixin):
     def matches_empty_str(self):
         '''δ(c) = ∅'''
         return NullRegex()
@@ -196,18 +347,68 @@ class AnyChar(Regex, SingletonMixin):
         return '.'
 
 class CharClass(Regex):
+    '''
+    The chars in a set of code points. However the set is given, it's stored as ranges: a sorted tuple of inclusive
+    (start, end) code point intervals, with invert applied, where no two overlap or touch. So equal sets are the same
+    CharClass, membership is a binary search, and a class is as small as its number of ranges, however wide they are.
+    '''
     def __new__(cls, invert, strs_or_char_ranges):
         raise_if_not(all((type(str_or_char_range) == str and len(str_or_char_range) == 1) or 
             (type(str_or_char_range) == CharRange) for str_or_char_range in strs_or_char_ranges),
             'strs_or_char_ranges must be a list of strings with length 1 and CharRange objects')
 
-        if len(strs_or_char_ranges) == 1 and type(strs_or_char_ranges[0]) == str and not invert:
-            return Char(strs_or_char_ranges[0])
+        ranges = _merge_ranges(sorted((ord(str_or_char_range.start), ord(str_or_char_range.end))
+            if type(str_or_char_range) == CharRange else (ord(str_or_char_range), ord(str_or_char_range))
+            for str_or_char_range in strs_or_char_ranges))
+        return cls.from_ranges(_complement_ranges(ranges) if invert else ranges)
 
-        self = super().__new__(cls)
-        self.strs_or_char_ranges = strs_or_char_ranges
-        self.invert = invert
-        return self
+    @classmethod
+    def from_ranges(cls, ranges):
+        '''
+        The class of the code points in ranges, (start, end) intervals that are sorted and neither overlap nor touch.
+        A class of one char is a Char.
+        '''
+        ranges = tuple(ranges)
+        if len(ranges) == 1 and ranges[0][0] == ranges[0][1]:
+            return Char(chr(ranges[0][0]))
+        return cls._intern(ranges=ranges)
+
+    @property
+    def invert(self):
+        '''True if the class is written as the chars it doesn't have, as it has the lowest and highest code points'''
+        return bool(self.ranges) and self.ranges[0][0] == 0 and self.ranges[-1][1] == sys.maxunicode
+
+    @property
+    def strs_or_char_ranges(self):
+        '''The chars and CharRanges of the class, or of its complement if invert'''
+        return tuple(chr(start) if start == end else CharRange(chr(start), chr(end))
+            for start, end in (_complement_ranges(self.ranges) if self.invert else self.ranges))
+
+    def __contains__(self, char):
+        code_point = ord(char)
+        i = bisect_right(self.ranges, (code_point, sys.maxunicode)) - 1 # the last range starting at or before char
+        return i >= 0 and code_point <= self.ranges[i][1]
+
+    def union(self, other):
+        '''The class of the chars in this class or other, a CharClass, Char or AnyChar'''
+        return CharClass.from_ranges(_merge_ranges(sorted(self.ranges + other.ranges)))
+
+    def intersection(self, other):
+        '''The class of the chars in both this class and other, a CharClass, Char or AnyChar'''
+        ranges, i, j = [], 0, 0
+        while i < len(self.ranges) and j < len(other.ranges):
+            start, end = max(self.ranges[i][0], other.ranges[j][0]), min(self.ranges[i][1], other.ranges[j][1])
+            if start <= end:
+                ranges.append((start, end))
+            if self.ranges[i][1] < other.ranges[j][1]:
+                i += 1
+            else:
+                j += 1
+        return CharClass.from_ranges(ranges)
+
+    def complement(self):
+        '''The class of every char not in this class'''
+        return CharClass.from_ranges(_complement_ranges(self.ranges))
 
     def matches_empty_str(self):
         '''δ(c) = ∅'''
@@ -216,13 +417,9 @@ class CharClass(Regex):
     def derivative(self, char):
         '''
         Dc(c) = ε
-        Dc(c') = ∅ if c' not in strs_or_char_ranges
-        invert option swaps ε for ∅ after evaluation
+        Dc(c') = ∅ if c' not in the class
         '''
-        derivative = Epsilon() if any(char in str_or_char_range for str_or_char_range in self.strs_or_char_ranges) else NullRegex()
-        if self.invert:
-            return Epsilon() if derivative == NullRegex() else NullRegex()
-        return derivative
+        return Epsilon() if char in self else NullRegex()
 
     def _chars_str(self):
         return [str_or_char_range.to_regex() if type(str_or_char_range) == CharRange else str(str_or_char_range) 
@@ -232,34 +429,21 @@ class CharClass(Regex):
         return '{0}in {1}'.format('not ' if self.invert else '', self._chars_str())
 
     def to_regex(self):
-        chars_str = self._chars_str()
-        for i in range(0, len(chars_str)):
-            if chars_str[i] in ('\\', ']'):
-                chars_str[i] = '\{0}'.format(chars_str[i])
-        # Only need to escape dashes (-) if not the first or last character of character class
-        for i in range(1, len(chars_str)-1):
-            if chars_str[i] == '-':
-                chars_str[i] = '\-'
+        chars_str = [_escape_in_class(str_or_char_range) if type(str_or_char_range) == str else
+            '{0}-{1}'.format(_escape_in_class(str_or_char_range.start), _escape_in_class(str_or_char_range.end))
+            for str_or_char_range in self.strs_or_char_ranges]
+        # A caret (^) only needs escaping as the first char, where it would mean the class is inverted
+        if chars_str and chars_str[0].startswith('^'):
+            chars_str[0] = '\\' + chars_str[0]
         return '[{0}{1}]'.format('^' if self.invert else '', ''.join(chars_str))
 
-class CharRange:
-    def __init__(self, start, end):
+class CharRange(HashConsMixin):
+    def __new__(cls, start, end):
         raise_if_not(start < end, 'Invalid CharRange, start >= end ({0} >= {1})'.format(start, end))
-        self.start = start
-        self.end = end
-        self.__iter__()
+        return cls._intern(start=start, end=end)
 
     def __iter__(self):
-        self.cur_idx = ord(self.start)
-        self.end_idx = ord(self.end)+1
-        return self
-
-    def __next__(self):
-        if self.cur_idx >= self.end_idx:
-            raise StopIteration()
-        char = chr(self.cur_idx)
-        self.cur_idx += 1
-        return char
+        return (chr(i) for i in range(ord(self.start), ord(self.end)+1))
 
     def __contains__(self, char):
         return self.start <= char <= self.end
@@ -267,10 +451,7 @@ class CharRange:
     def to_regex(self):
         return '{0}-{1}'.format(self.start, self.end)
 
-    def __eq__(self, other):
-        return type(other) == CharRange and self.start == other.start and self.end == other.end
-
-class Epsilon(Regex, SingletonMixin):
+class Epsilon(Regex):
     '''Represents a value matchable with no input'''
     def matches_empty_str(self):
         '''δ(ε) = ε'''
@@ -286,7 +467,7 @@ class Epsilon(Regex, SingletonMixin):
     def to_regex(self):
         return ''
 
-class NullRegex(Regex, SingletonMixin):
+class NullRegex(Regex):
     '''Represents a pattern that is impossible to match'''
     def matches_empty_str(self):
         '''δ(∅) = ∅'''
@@ -304,3 +485,35 @@ class NullRegex(Regex, SingletonMixin):
 
 
 _do_not_need_brackets = (CharClass, Char, AnyChar)
+
+def _merge_ranges(ranges):
+    '''Sorted (start, end) ranges with those that overlap or touch merged'''
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+def _complement_ranges(ranges):
+    '''The ranges of the code points not in ranges, which are sorted, and neither overlap nor touch'''
+    complement = []
+    next_start = 0
+    for start, end in ranges:
+        if next_start < start:
+            complement.append((next_start, start - 1))
+        next_start = end + 1
+    if next_start <= sys.maxunicode:
+        complement.append((next_start, sys.maxunicode))
+    return complement
+
+def _escape_in_class(char):
+    if char in ('\\', ']', '-'):
+        return '\\' + char
+    return char
+
+def _escape(char):
+    if char in ('(', ')', '\\', '.', '|', '*', '+', '?', '[', ']', '{', '}'):
+        return '\{0}'.format(char)
+    return char
@@ -1,13 +1,22 @@
 import adt
 from utils import raise_if_not
 
+def _balanced_tree(constructor, regexes):
+    '''Pairs up neighbouring regexes until there's one left, so the tree is about log2(len(regexes)) deep'''
+    while len(regexes) > 1:
+        pairs = [constructor(regexes[i], regexes[i + 1]) for i in range(0, len(regexes) - 1, 2)]
+        if len(regexes) % 2:
+            pairs.append(regexes[-1])
+        regexes = pairs
+    return regexes[0]
+
 def sequence_tree_from_regexes(regexes):
     raise_if_not(len(regexes) >= 2, 'Regexes must contain at least two objects to build a Sequence')
+    return _balanced_tree(adt.Sequence, regexes)
 
-    sequence = regexes[0]
-    for i in range(1, len(regexes)):
-        sequence = adt.Sequence(sequence, regexes[i])
-    return sequence
+def or_tree_from_regexes(regexes):
+    raise_if_not(len(regexes) >= 2, 'Regexes must contain at least two objects to build an Or')
+    return adt.Or.from_regexes(regexes)
 
 def char_sequence_from_str(s):
-    return sequence_tree_from_regexes([adt.Char(c) for c in s])
+    return adt.Literal(s)
@@ -0,0 +1,55 @@
+'''Aho-Corasick automaton, to find which of many literal strings occur in a string with one pass'''
+
+class AhoCorasick:
+    '''
+    A trie of the words, where each node also has a fail link to the node for the longest proper suffix of its path
+    that is also in the trie. Following the trie edges, and the fail links where there's no edge, every word that
+    ends at the current position is in outputs of the current node.
+    '''
+    def __init__(self, words):
+        self.words = list(words)
+        self.on_char = [{}] # node -> {char: node}, node 0 is the root
+        self.outputs = [set()] # node -> indexes of the words that end at node
+        for i, word in enumerate(self.words):
+            assert word, "Can't find empty words"
+            node = 0
+            for char in word:
+                if char not in self.on_char[node]:
+                    self.on_char[node][char] = len(self.on_char)
+                    self.on_char.append({})
+                    self.outputs.append(set())
+                node = self.on_char[node][char]
+            self.outputs[node].add(i)
+        self.fail = self._fail_links()
+
+    def _fail_links(self):
+        '''Breadth first, so the fail link of a node's parent is always known before the node's'''
+        fail = [0] * len(self.on_char)
+        to_visit = list(self.on_char[0].values())
+        for node in to_visit:
+            for char, child in self.on_char[node].items():
+                to_visit.append(child)
+                suffix = fail[node]
+                while suffix and char not in self.on_char[suffix]:
+                    suffix = fail[suffix]
+                fail[child] = self.on_char[suffix].get(char, 0)
+                self.outputs[child] |= self.outputs[fail[child]]
+        return fail
+
+    def find(self, s):
+        '''Returns the set of indexes of the words that occur in s'''
+        on_char, fail, outputs = self.on_char, self.fail, self.outputs
+        found = set()
+        node = 0
+        for char in s:
+            while node and char not in on_char[node]:
+                node = fail[node]
+            node = on_char[node].get(char, 0)
+            if outputs[node]:
+                found |= outputs[node]
+                if len(found) == len(self.words):
+                    break
+        return found
+
+def from_words(words):
+    return AhoCorasick(words)
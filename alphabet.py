@@ -0,0 +1,81 @@
+'''Partitions the characters into equivalence classes of characters that no part of a regex can tell apart'''
+import adt
+import sys
+import utf8 as utf8_
+from bisect import bisect_right
+
+class Alphabet:
+    '''
+    Every character belongs to exactly one class, numbered 0 to len(alphabet)-1. Class i is the characters with code
+    points from boundaries[i] up to, but not including, boundaries[i+1]. The last class runs up to sys.maxunicode.
+    If utf8 is True, the classes are of the bytes of UTF-8 encoded strings instead, each byte as the char with the
+    same code point, and automata built with the alphabet match bytes rather than str.
+    '''
+    def __init__(self, boundaries, utf8=False):
+        self.boundaries = boundaries
+        self.utf8 = utf8
+        self._class_of = {} # char -> class, filled in as chars are looked up
+        self._byte_classes = None
+
+    def __len__(self):
+        return len(self.boundaries)
+
+    def class_of(self, char):
+        '''The class char belongs to'''
+        class_ = self._class_of.get(char)
+        if class_ is None:
+            class_ = self._class_of[char] = bisect_right(self.boundaries, ord(char)) - 1
+        return class_
+
+    def byte_classes(self):
+        '''List of the class of each byte value, for reading bytes as the chars with the same code points'''
+        if self._byte_classes is None:
+            self._byte_classes = [self.class_of(chr(byte)) for byte in range(256)]
+        return self._byte_classes
+
+    def classes_of_range(self, start, end):
+        '''All the classes of the chars from start to end, inclusive. The boundaries must include the range.'''
+        return range(self.class_of(start), self.class_of(end) + 1)
+
+    def code_point_range(self, class_):
+        '''The lowest and highest code point in class_'''
+        end = self.boundaries[class_ + 1] - 1 if class_ + 1 < len(self.boundaries) else sys.maxunicode
+        return self.boundaries[class_], end
+
+    def representative(self, class_):
+        '''A char in class_, which behaves the same as every other char in class_'''
+        return chr(self.boundaries[class_])
+
+def from_asts(regexes, utf8=False):
+    '''
+    Alphabet with the fewest classes such that every Char, CharClass and CharRange in regexes is made of whole classes.
+    If utf8 is True, it's an alphabet of bytes, such that every byte range of their UTF-8 encodings is of whole classes.
+    '''
+    boundaries = set([0])
+    to_visit = list(regexes)
+    while to_visit:
+        regex = to_visit.pop()
+        if type(regex) in (adt.Or, adt.Sequence):
+            to_visit.extend((regex.regex_a, regex.regex_b))
+        elif type(regex) in (adt.ZeroOrMore, adt.Optional, adt.Repeat):
+            to_visit.append(regex.regex)
+        elif utf8 and type(regex) in (adt.Char, adt.AnyChar, adt.CharClass):
+            for start, end in utf8_.code_point_ranges(regex):
+                for sequence in utf8_.byte_sequences(start, end):
+                    boundaries.update(boundary for low, high in sequence for boundary in (low, high + 1))
+        elif utf8 and type(regex) == adt.Literal:
+            boundaries.update(boundary for byte in utf8_.encode(regex.rest) or b'' for boundary in (byte, byte + 1))
+        elif type(regex) == adt.Char:
+            boundaries.update((ord(regex.char), ord(regex.char) + 1))
+        elif type(regex) == adt.Literal:
+            boundaries.update(boundary for char in regex.rest for boundary in (ord(char), ord(char) + 1))
+        elif type(regex) == adt.CharClass:
+            boundaries.update(boundary for start, end in regex.ranges for boundary in (start, end + 1))
+        elif type(regex) not in (adt.AnyChar, adt.Epsilon, adt.NullRegex):
+            raise ValueError("Can't find the alphabet of unknown type: {0}".format(regex))
+
+    boundaries.discard(256 if utf8 else sys.maxunicode + 1)
+    return Alphabet(sorted(boundaries), utf8)
+
+def from_ast(regex, utf8=False):
+    return from_asts([regex], utf8)
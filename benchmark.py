@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+'''
+Times each phase of matching (parsing, building the NFA, building the DFA, and matching with the derivative, NFA
+and DFA engines) over several families of patterns and input sizes from 10 B to 10 MB. Results are written as JSON,
+and compared against a baseline, so regressions are caught:
+    python benchmark.py --output results.json
+    python benchmark.py --baseline benchmarks/baseline.json
+'''
+import argparse
+import dfa
+import json
+import nfa
+import parser
+import platform
+import sys
+import time
+
+SIZES = [10, 100, 1000, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+# The largest input each engine is run on. Regex.matches builds a new derivative per char, so is too slow past 100.
+MAX_SIZES = {'derivative': 100, 'nfa': 10 ** 5, 'dfa': 10 ** 7}
+
+def _repeat(unit, size, tail=''):
+    '''unit repeated to make, with tail on the end, a string of at most size chars, or just tail if that's longer'''
+    return unit * max(0, (size - len(tail)) // len(unit)) + tail
+
+def _word(i):
+    return ''.join(chr(ord('a') + int(digit)) for digit in str(i)) + 'x'
+
+_WORDS = '|'.join(_word(i) for i in range(200))
+
+# family -> [(pattern, size -> input)]. The inputs match, so every engine reads all of them, which for the
+# pathological patterns means a single input as long as the pattern's shortest match.
+FAMILIES = {
+    'literal': [
+        ('ERROR: .*refused', lambda size: 'ERROR: ' + _repeat('x ', size - 7, 'refused')),
+        ('(GET /index\\.html HTTP/1\\.1\n)*', lambda size: _repeat('GET /index.html HTTP/1.1\n', size)),
+    ],
+    'email': [
+        ('\\w+@\\w+\\.\\w+', lambda size: _repeat('user', size, '@h.io')),
+        ('[a-z0-9._]+@[a-z0-9]+\\.(com|org|net)', lambda size: _repeat('x.y', size, '@h.org')),
+    ],
+    'pathological': [
+        ('a?' * 10 + 'a' * 10, lambda size: 'a' * 10),
+        ('a?' * 20 + 'a' * 20, lambda size: 'a' * 20),
+    ],
+    'wide_class': [
+        ('[Ā-￿]+', lambda size: _repeat('日本語', size)),
+        ('[^,\n]+(,[^,\n]+)*', lambda size: _repeat('field,', size, 'end')),
+    ],
+    'alternation': [
+        ('({0})( ({0}))*'.format(_WORDS), lambda size: _repeat(_word(123) + ' ', size, _word(7))),
+    ],
+    'counted': [
+        ('[a-z]{2,8}(-[a-z]{2,8})*', lambda size: _repeat('abcde-', size, 'abcde')),
+        ('(\\d{3}-){2}\\d{4}( (\\d{3}-){2}\\d{4})*', lambda size: _repeat('555-123-4567 ', size, '555-123-4567')),
+    ],
+}
+
+def _time(function, repeats):
+    '''The fastest of repeats calls of function, in seconds'''
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def _repeats(size):
+    return 5 if size <= 10 ** 4 else 1
+
+def run(families=None, sizes=None):
+    '''
+    Returns a list of results, dicts of family, pattern, phase ('parse', 'nfa_build', 'dfa_build' or 'match'),
+    engine (for 'match', else None), size (of the input, for 'match', else None) and seconds.
+    '''
+    results = []
+    for family in families or FAMILIES:
+        for pattern, make_input in FAMILIES[family]:
+            def result(phase, seconds, engine=None, size=None):
+                results.append({'family': family, 'pattern': pattern, 'phase': phase, 'engine': engine,
+                    'size': size, 'seconds': seconds})
+
+            ast = parser.parse_regex(pattern)
+            nfa_ = nfa.from_ast(ast)
+            dfa_ = dfa.from_nfa(nfa_).compile()
+            result('parse', _time(lambda: parser.parse_regex(pattern), 5))
+            result('nfa_build', _time(lambda: nfa.from_ast(ast), 5))
+            result('dfa_build', _time(lambda: dfa.from_nfa(nfa_).compile(), 3))
+
+            engines = {'derivative': ast.matches, 'nfa': nfa_.matches, 'dfa': dfa_.matches}
+            inputs = {len(s): s for s in map(make_input, sizes or SIZES)} # some inputs can't be made small
+            for s in inputs.values():
+                for engine, matches in engines.items():
+                    if len(s) <= MAX_SIZES[engine]:
+                        result('match', _time(lambda: matches(s), _repeats(len(s))), engine, len(s))
+    return results
+
+def _key(result):
+    return (result['family'], result['pattern'], result['phase'], result['engine'], result['size'])
+
+def compare(results, baseline, threshold=1.5, min_seconds=0.005):
+    '''
+    Returns (result, baseline seconds) for each result that is more than threshold times slower than the result with
+    the same family, pattern, phase, engine and size in baseline, and slower by at least min_seconds, so the noise in
+    timing very short phases isn't reported.
+    '''
+    baseline_seconds = {_key(result): result['seconds'] for result in baseline}
+    regressions = []
+    for result in results:
+        before = baseline_seconds.get(_key(result))
+        if before is not None and result['seconds'] > before * threshold and result['seconds'] - before >= min_seconds:
+            regressions.append((result, before))
+    return regressions
+
+def _describe(result):
+    return '{0} {1!r} {2}{3}{4}'.format(result['family'], result['pattern'][:40], result['phase'],
+        ' ' + result['engine'] if result['engine'] else '', ' {0}B'.format(result['size']) if result['size'] else '')
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Benchmark the regex engines')
+    arg_parser.add_argument('--output', help='file to write the results to, as JSON')
+    arg_parser.add_argument('--baseline', help='JSON results to compare against, exiting with 1 if any regressed')
+    arg_parser.add_argument('--threshold', type=float, default=1.5,
+        help='how many times slower than the baseline is a regression (default 1.5)')
+    arg_parser.add_argument('--families', nargs='+', choices=list(FAMILIES), help='families to run (default all)')
+    arg_parser.add_argument('--max-size', type=int, help='largest input size to run (default {0})'.format(SIZES[-1]))
+    args = arg_parser.parse_args()
+
+    sizes = [size for size in SIZES if args.max_size is None or size <= args.max_size]
+    results = run(args.families, sizes)
+    for result in results:
+        print('{0:<70} {1:.6f}s'.format(_describe(result), result['seconds']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'results': results}, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold)
+        for result, before in regressions:
+            print('REGRESSION {0}: {1:.6f}s, was {2:.6f}s'.format(_describe(result), result['seconds'], before))
+        if regressions:
+            sys.exit(1)
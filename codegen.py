@@ -0,0 +1,136 @@
+'''Generates Python source specialized to a DFA, so matching runs as plain comparisons rather than table lookups'''
+import weakref
+from utils import raise_if
+
+MAX_STATES = 500 # every char steps through an if/elif chain over the states, so bigger DFAs are faster as tables
+_MAX_COMPARISONS = 1 # classes with more ranges than this are checked with a frozenset, if it's small enough
+_MAX_SET_SIZE = 1024
+
+class GeneratedDFA:
+    '''
+    The matches and find_longest_match functions generated for a CompiledDFA, which behave the same as the
+    CompiledDFA's methods, with the source they were compiled from. Each state is a branch of an if/elif chain
+    that compares the current char directly against the ranges of chars that lead to each of its targets.
+    '''
+    def __init__(self, source, namespace):
+        self.source = source
+        self.matches = namespace['matches']
+        self.find_longest_match = namespace['find_longest_match']
+
+class _Generator:
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self.utf8 = compiled.alphabet.utf8
+        self.namespace = {}
+
+    def literal(self, code_point):
+        return str(code_point) if self.utf8 else repr(chr(code_point))
+
+    def ranges_of_target(self, state):
+        '''Dict of each state moved to from state -> the sorted code point ranges, inclusive, that move to it'''
+        compiled, num_classes = self.compiled, len(self.compiled.alphabet)
+        ranges = {}
+        for char_class in range(num_classes):
+            start, end = compiled.alphabet.code_point_range(char_class)
+            if self.utf8:
+                if start > 255:
+                    continue
+                end = min(end, 255)
+            target_ranges = ranges.setdefault(compiled.table[state * num_classes + char_class], [])
+            if target_ranges and target_ranges[-1][1] + 1 == start:
+                target_ranges[-1] = (target_ranges[-1][0], end)
+            else:
+                target_ranges.append((start, end))
+        return ranges
+
+    def condition(self, ranges):
+        '''A Python expression that's True if char is in ranges'''
+        if len(ranges) > _MAX_COMPARISONS and sum(end - start + 1 for start, end in ranges) <= _MAX_SET_SIZE:
+            name = '_chars{0}'.format(len(self.namespace))
+            chars = (code_point if self.utf8 else chr(code_point) for start, end in ranges
+                for code_point in range(start, end + 1))
+            self.namespace[name] = frozenset(chars)
+            return 'char in {0}'.format(name)
+        return ' or '.join('char == {0}'.format(self.literal(start)) if start == end else
+            '{0} <= char <= {1}'.format(self.literal(start), self.literal(end)) for start, end in ranges)
+
+    def move(self, state, target, indent, on_dead, on_accepting):
+        '''The statements that move from state to target, breaking out to the state chain if target isn't state'''
+        if self.compiled.dead[target]:
+            return [indent + on_dead]
+        statements = []
+        if on_accepting and self.compiled.accepting[target]:
+            statements.append(indent + on_accepting)
+        if target != state:
+            statements += [indent + 'state = {0}'.format(target), indent + 'break']
+        return statements or [indent + 'pass']
+
+    def state_chain(self, indent, loop, on_dead, on_end, on_accepting=None):
+        '''
+        The if/elif chain over the states, where each state loops over the chars until one moves it to another state.
+        loop is the lines of a for statement setting char to each remaining char, on_dead the statement run when a
+        char leads to a dead state, on_end a function of a state giving the statement run when the chars run out in
+        it, and on_accepting the statement run after moving to an accepting state.
+        '''
+        lines = []
+        live_states = [state for state in range(self.compiled.num_states) if not self.compiled.dead[state]]
+        for i, state in enumerate(live_states):
+            lines.append('{0}{1} state == {2}:'.format(indent, 'if' if i == 0 else 'elif', state))
+            lines += [indent + '    ' + line for line in loop]
+            body_indent = indent + '        '
+
+            ranges = self.ranges_of_target(state)
+            # The target reached on the most chars is the else branch, so it costs no comparisons
+            default = max(ranges, key=lambda target: sum(end - start + 1 for start, end in ranges[target]))
+            targets = [target for target in ranges if target != default]
+            for j, target in enumerate(targets):
+                lines.append('{0}{1} {2}:'.format(body_indent, 'if' if j == 0 else 'elif',
+                    self.condition(ranges[target])))
+                lines += self.move(state, target, body_indent + '    ', on_dead, on_accepting)
+            if targets:
+                lines.append(body_indent + 'else:')
+                lines += self.move(state, default, body_indent + '    ', on_dead, on_accepting)
+            else:
+                lines += self.move(state, default, body_indent, on_dead, on_accepting)
+            lines += [indent + '    else:', indent + '        ' + on_end(state)]
+        return lines
+
+    def generate(self):
+        compiled = self.compiled
+        lines = ['def matches(s):']
+        if compiled.dead[compiled.entry]:
+            lines.append('    return False')
+        else:
+            lines += ['    chars = iter(s)', '    state = {0}'.format(compiled.entry), '    while True:']
+            lines += self.state_chain('        ', ['for char in chars:'], on_dead='return False',
+                on_end=lambda state: 'return {0}'.format(compiled.accepting[state]))
+
+        lines += ['', 'def find_longest_match(s, start):']
+        if compiled.dead[compiled.entry]:
+            lines.append('    return None')
+        else:
+            lines += ['    indexes = iter(range(start, len(s)))', '    state = {0}'.format(compiled.entry),
+                '    end = {0}'.format('start' if compiled.accepting[compiled.entry] else 'None'), '    while True:']
+            lines += self.state_chain('        ', ['for i in indexes:', '    char = s[i]'], on_dead='return end',
+                on_end=lambda state: 'return end', on_accepting='end = i + 1')
+        return '\n'.join(lines) + '\n'
+
+_generated = weakref.WeakKeyDictionary() # CompiledDFA -> GeneratedDFA
+
+def from_compiled_dfa(compiled):
+    '''
+    Returns the GeneratedDFA for compiled, a CompiledDFA with at most MAX_STATES states, generating and compiling
+    its source on the first call. A utf8 DFA's functions match bytes-like objects, any other's match str.
+    '''
+    if compiled not in _generated:
+        raise_if(compiled.num_states > MAX_STATES, 'Too many states to generate code for: {0} > {1}'.format(
+            compiled.num_states, MAX_STATES))
+        generator = _Generator(compiled)
+        source = generator.generate()
+        exec(compile(source, '<generated DFA>', 'exec'), generator.namespace)
+        _generated[compiled] = GeneratedDFA(source, generator.namespace)
+    return _generated[compiled]
+
+def from_dfa(dfa):
+    '''from_compiled_dfa for a dfa.DFA'''
+    return from_compiled_dfa(dfa.compile())
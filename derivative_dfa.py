@@ -0,0 +1,64 @@
+'''A DFA built lazily from Brzozowski derivatives of an AST'''
+import adt
+import alphabet as alphabet_
+import literals
+import stats
+
+class DerivativeDFA:
+    '''
+    Each distinct derivative of the regex is a state, created the first time the input reaches it. Transitions are
+    memoized per state and char class, so the derivative of a state with respect to the chars in a class is only ever
+    taken once. Once the states an input needs have been built, matching costs two dict lookups per character.
+    '''
+    def __init__(self, regex):
+        self.alphabet = alphabet_.from_ast(regex)
+        self.prefilter = literals.from_ast(regex)
+        self.regexes = [] # state -> the derivative it represents
+        self.accepting = [] # state -> True if the derivative matches the empty string
+        self.on_char = [] # state -> {char class: state}
+        self._states = {} # derivative -> state
+        self.entry = self._state(regex)
+        self.trap = self._state(adt.NullRegex())
+
+    def _state(self, regex):
+        '''Returns the state for regex, creating it if this derivative hasn't been seen before'''
+        if regex not in self._states:
+            self._states[regex] = len(self.regexes)
+            self.regexes.append(regex)
+            self.accepting.append(regex.matches_empty_str() == adt.Epsilon())
+            self.on_char.append({})
+        return self._states[regex]
+
+    def _add_edge(self, state, char_class):
+        '''Takes the derivative of state with respect to the chars in char_class, memoizing the resulting edge'''
+        next_state = self._state(self.regexes[state].derivative(self.alphabet.representative(char_class)))
+        self.on_char[state][char_class] = next_state
+        return next_state
+
+    def num_states(self):
+        return len(self.regexes)
+
+    def matches(self, s):
+        ''' True if the regex matches the entire string s '''
+        stats.add('chars_scanned', len(s))
+        if not self.prefilter.could_match(s):
+            return False
+        state = self.entry
+        hits = misses = 0
+        for char in s:
+            char_class = self.alphabet.class_of(char)
+            next_state = self.on_char[state].get(char_class)
+            if next_state is None:
+                next_state = self._add_edge(state, char_class)
+                misses += 1
+            else:
+                hits += 1
+            state = next_state
+            if state == self.trap:
+                break
+        stats.add('derivative_calls', misses)
+        stats.add('derivative_cache_hits', hits)
+        return self.accepting[state]
+
+def from_ast(regex):
+    return DerivativeDFA(regex)
@@ -1,17 +1,26 @@
+import alphabet as alphabet_
 import generators
-from utils import lpartition, find, DefaultDict
-from collections import namedtuple
-from nfa import NFAState
+import literals
+import nfa as nfa_
+import stats
+from array import array
+from utils import DefaultDict, raise_if
+
+try:
+    import numpy
+except ImportError: # optional, only needed by CompiledDFA.matches_many
+    numpy = None
+
+MATCHES_MANY_MAX_CELLS = 1 << 22 # the most chars, with padding, that matches_many converts to classes at once
+MAX_REVERSED_STATES = 1 << 10 # the subset construction of reversed() can blow up exponentially, so stops at this
 
 class DFAState:
-    def __init__(self, is_accepting=False):
+    '''Edges are keyed by the class of the char they match in the DFA's alphabet'''
+    def __init__(self, is_accepting=False, pattern_ids=frozenset()):
         self.is_accepting = is_accepting
+        self.pattern_ids = pattern_ids # of the RegexSet patterns this state accepts
         self.on_char = {}
 
-    def is_trap(self):
-        '''A state is a trap if it is not accepting and it has no exits except looping back on itself'''
-        return not self.is_accepting and self.on_char == {} and self.on_char['random-val'] == self
-
     def on_unmatched_char(self, state=None):
         '''Used by AnyChar and inverted CharClass to avoid enumerating every possible character'''
         if state:
@@ -21,147 +30,534 @@ class DFAState:
             assert type(self.on_char) == DefaultDict, 'on_unmatched_char is not set'
             return self.on_char.default_factory()
 
-    def add_edge(self, char, state):
-        assert len(char) == 1, 'char must be a string of length 1, got: {0}'.format(char)
-        assert char not in self.on_char, 'Already have an edge for char: {0}'.format(char)
-        self.on_char[char] = state
+    def add_edge(self, char_class, state):
+        assert char_class not in self.on_char, 'Already have an edge for char class: {0}'.format(char_class)
+        self.on_char[char_class] = state
 
-    def matches(self, s):
-        return self.is_accepting if len(s) == 0 else self.on_char[s[0]].matches(s[1:])
+class DFA:
+    '''A graph of DFAStates, as built by from_nfa. Matching is done by the CompiledDFA from compile()'''
+    def __init__(self, entry, alphabet, states_removed=0, prefilter=None):
+        self.entry = entry
+        self.alphabet = alphabet
+        self.states_removed = states_removed # by minimize()
+        self.prefilter = prefilter # literals.Prefilter of the regex, if known
+        self._compiled = None
 
-    def find_longest_match(self, consumed, left):
-        ''' Find longest possible match for string `left` given we've already traversed chars `consumed` '''
-        state = self
-        biggest_match = None
+    def states(self):
+        '''All states reachable from entry, in breadth-first order'''
+        states = [self.entry]
+        discovered = set(states)
+        for state in states:
+            targets = list(state.on_char.values())
+            if type(state.on_char) == DefaultDict:
+                targets.append(state.on_unmatched_char())
+            for target in targets:
+                if target not in discovered:
+                    discovered.add(target)
+                    states.append(target)
+        return states
 
-        while left and not state.is_trap():
-            if state.is_accepting:
-                biggest_match = consumed
+    def compile(self):
+        '''Returns the CompiledDFA for this DFA, which is built on the first call'''
+        if self._compiled is None:
+            states = self.states()
+            index = {state: i for i, state in enumerate(states)}
+            table = array('i', (index[state.on_char[char_class]] for state in states 
+                for char_class in range(len(self.alphabet))))
+            accepting = [state.is_accepting for state in states]
+            pattern_ids = [state.pattern_ids for state in states]
+            self._compiled = CompiledDFA(table, accepting, self.alphabet, entry=index[self.entry], 
+                pattern_ids=pattern_ids, prefilter=self.prefilter)
+        return self._compiled
 
-            consumed += left[0]
-            state = state.on_char[left[0]]
-            left = left[1:]
+    def matches(self, s):
+        ''' True if DFA matches the entire string s '''
+        return self.compile().matches(s)
 
-        return biggest_match
+    def find_match_spans(self, s):
+        return self.compile().find_match_spans(s)
 
-class DFA:
-    def __init__(self, entry):
+    def find_subset_matches(self, s):
+        return self.compile().find_subset_matches(s)
+
+class CompiledDFA:
+    '''
+    A DFA flattened into a table. States are numbered 0 to num_states-1, and table[state * len(alphabet) + char_class]
+    is the state to move to from state on a char in char_class.
+    '''
+    def __init__(self, table, accepting, alphabet, entry=0, pattern_ids=None, prefilter=None, dead=None):
+        self.table = table
+        self.accepting = accepting
+        self.pattern_ids = pattern_ids # state -> pattern_ids of the DFAState it came from
+        self.alphabet = alphabet
         self.entry = entry
+        self.prefilter = prefilter # literals.Prefilter, to rule out strings without running the DFA
+        self.num_states = len(accepting)
+        self.dead = dead if dead is not None else self._dead_states()
+        self._reversed = None
+        self._states_after = {} # prefix -> the state moved to from the entry on reading it
+        self._numpy_tables = None
+
+    def _class_of(self, s):
+        '''
+        The char -> class lookup for s. Strings are read a char at a time, and bytes-like objects (bytes, bytearray,
+        memoryview) a byte at a time, each byte as the char with the same code point. A DFA of a utf8 alphabet reads
+        its chars as their UTF-8 bytes, so only matches bytes-like objects.
+        '''
+        if self.alphabet.utf8:
+            raise_if(isinstance(s, str), 'A UTF-8 DFA matches bytes, so str must be encoded first')
+        return self.alphabet.class_of if isinstance(s, str) else self.alphabet.byte_classes().__getitem__
+
+    def _prefilter_for(self, s):
+        '''The prefilter, if it can search s; memoryviews can't be searched for substrings'''
+        return self.prefilter if isinstance(s, (str, bytes, bytearray)) else None
+
+    def _dead_states(self):
+        '''For each state, True if no accepting state can be reached from it, so matching can stop early'''
+        num_classes = len(self.alphabet)
+        moves_to = [[] for _ in range(self.num_states)]
+        for state in range(self.num_states):
+            for target in set(self.table[state * num_classes:(state + 1) * num_classes]):
+                moves_to[target].append(state)
+
+        dead = [True] * self.num_states
+        to_visit = [state for state in range(self.num_states) if self.accepting[state]]
+        for state in to_visit:
+            dead[state] = False
+        while to_visit:
+            for state in moves_to[to_visit.pop()]:
+                if dead[state]:
+                    dead[state] = False
+                    to_visit.append(state)
+        return dead
 
     def matches(self, s):
         ''' True if DFA matches the entire string s '''
-        return self.entry.matches(s)
+        stats.add('chars_scanned', len(s))
+        prefilter = self._prefilter_for(s)
+        state, chars = self.entry, s
+        if prefilter is not None:
+            if not prefilter.could_match(s):
+                return False
+            literals = prefilter.literals_for(s)
+            if literals.exact is not None: # could_match compared s to it
+                return True
+            if literals.prefix: # s starts with it, so the DFA needn't read it
+                state, chars = self._state_after(literals.prefix), s[len(literals.prefix):]
+        table, num_classes, class_of, dead = self.table, len(self.alphabet), self._class_of(s), self.dead
+        for char in chars:
+            state = table[state * num_classes + class_of(char)]
+            if dead[state]:
+                return False
+        return self.accepting[state]
+
+    def matches_many(self, strings):
+        '''
+        matches for each of strings, a sequence of all str or all bytes-like objects, as a numpy array of bools. Needs
+        numpy. The strings are sorted by length and split into batches, each converted to a matrix of classes with a
+        row per string, padded with a class that leaves the state as it is. Then every row's state is moved on at once,
+        a column at a time, so the work per char is a few vector operations rather than a loop in Python per string.
+        '''
+        raise_if(numpy is None, 'matches_many needs numpy, which is not installed')
+        lengths = numpy.fromiter(map(len, strings), dtype=numpy.intp, count=len(strings))
+        stats.add('chars_scanned', int(lengths.sum()))
+        table, accepting = self._vectorized_tables()
+        order = numpy.argsort(lengths, kind='stable')
+        sorted_lengths = lengths[order]
+        results = numpy.empty(len(strings), dtype=bool)
+        for start, end in _batches(sorted_lengths, MATCHES_MANY_MAX_CELLS):
+            rows = order[start:end]
+            classes = self._class_matrix([strings[row] for row in rows], sorted_lengths[start:end])
+            states = numpy.full(end - start, self.entry, dtype=numpy.intp)
+            for column in classes:
+                states = table[states, column]
+            results[rows] = accepting[states]
+        return results
+
+    def _vectorized_tables(self):
+        '''
+        The table as a numpy matrix of state by class, with a column for the padding class that moves each state to
+        itself, and accepting as a numpy array
+        '''
+        if self._numpy_tables is None:
+            num_classes = len(self.alphabet)
+            table = numpy.asarray(self.table, dtype=numpy.intp).reshape(self.num_states, num_classes)
+            table = numpy.hstack([table, numpy.arange(self.num_states, dtype=numpy.intp)[:, None]])
+            self._numpy_tables = (table, numpy.asarray(self.accepting, dtype=bool))
+        return self._numpy_tables
+
+    def _class_matrix(self, batch, lengths):
+        '''The classes of the chars of batch, strings of lengths, in a matrix with a column per string'''
+        if isinstance(batch[0], str):
+            raise_if(self.alphabet.utf8, 'A UTF-8 DFA matches bytes, so str must be encoded first')
+            code_points = numpy.frombuffer(''.join(batch).encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+            boundaries = numpy.asarray(self.alphabet.boundaries, dtype=numpy.int64)
+            classes = numpy.searchsorted(boundaries, code_points, side='right') - 1
+        else:
+            byte_classes = numpy.asarray(self.alphabet.byte_classes(), dtype=numpy.intp)
+            classes = byte_classes[numpy.frombuffer(b''.join(batch), dtype=numpy.uint8)]
+
+        matrix = numpy.full((len(batch), lengths[-1]), len(self.alphabet), dtype=numpy.intp)
+        matrix[numpy.arange(lengths[-1]) < lengths[:, None]] = classes # fills each row's chars in order
+        return numpy.ascontiguousarray(matrix.T)
+
+    def _state_after(self, prefix):
+        '''The state moved to from the entry on reading prefix, a str or bytes'''
+        if prefix not in self._states_after:
+            table, num_classes, class_of = self.table, len(self.alphabet), self._class_of(prefix)
+            state = self.entry
+            for char in prefix:
+                state = table[state * num_classes + class_of(char)]
+            self._states_after[prefix] = state
+        return self._states_after[prefix]
+
+    def find_longest_match(self, s, start):
+        ''' Returns the end of the longest match in s that starts at start, or None if there is no match '''
+        return self._longest_match(s, start)[0]
+
+    def _longest_match(self, s, start):
+        '''Returns (find_longest_match(s, start), the index after the last char read to find it)'''
+        table, num_classes, class_of, dead, accepting = (self.table, len(self.alphabet), self._class_of(s),
+            self.dead, self.accepting)
+        state = self.entry
+        end = start if accepting[state] else None
+        for i in range(start, len(s)):
+            state = table[state * num_classes + class_of(s[i])]
+            if dead[state]:
+                return end, i + 1
+            if accepting[state]:
+                end = i + 1
+        return end, len(s)
+
+    def reversed(self):
+        '''
+        Returns a CompiledDFA that reads a string backwards and accepts after reading the char at i if a non-empty
+        match of this DFA starts at i. Built with the subset construction: each of its states is the set of states
+        of this DFA that can reach an accepting state by reading the chars after i. Returns None if that would take
+        more than MAX_REVERSED_STATES states, as for ([ab]{12}b|c)*, which needs 2 ** 13.
+        '''
+        if self._reversed is None:
+            num_classes = len(self.alphabet)
+            moves_to = [[[] for _ in range(num_classes)] for _ in range(self.num_states)]
+            for state in range(self.num_states):
+                for char_class in range(num_classes):
+                    moves_to[self.table[state * num_classes + char_class]][char_class].append(state)
+            accepting = frozenset(state for state in range(self.num_states) if self.accepting[state])
+
+            state_sets = [frozenset()] # a match can't start at the end of the string, as it'd be empty
+            index = {state_sets[0]: 0}
+            table = array('i')
+            for state_set in state_sets:
+                # A match may end right after i, or continue into the chars after i
+                can_reach = state_set | accepting
+                for char_class in range(num_classes):
+                    to_state_set = frozenset(state for target in can_reach for state in moves_to[target][char_class])
+                    if to_state_set not in index:
+                        if len(state_sets) == MAX_REVERSED_STATES:
+                            self._reversed = False
+                            return None
+                        index[to_state_set] = len(state_sets)
+                        state_sets.append(to_state_set)
+                    table.append(index[to_state_set])
+            self._reversed = CompiledDFA(table, [self.entry in state_set for state_set in state_sets], self.alphabet)
+            # reversed state * num_states + state -> 1 if state is in the reversed state's set
+            self._reversed_sets = bytearray(len(state_sets) * self.num_states)
+            for reversed_state, state_set in enumerate(state_sets):
+                for state in state_set:
+                    self._reversed_sets[reversed_state * self.num_states + state] = 1
+        return self._reversed or None # False if it has too many states
+
+    def match_starts(self, s):
+        '''
+        Returns a bytearray that is 1 at each index of s where a non-empty match starts, with one backwards pass, or a
+        forwards scan from each index if reversed() has too many states
+        '''
+        reversed_ = self.reversed()
+        if reversed_ is None:
+            return bytearray(self.find_longest_match(s, start) not in (None, start) for start in range(len(s)))
+        table, num_classes, class_of, accepting = (reversed_.table, len(self.alphabet), self._class_of(s),
+            reversed_.accepting)
+        starts = bytearray(len(s))
+        state = reversed_.entry
+        for i in range(len(s) - 1, -1, -1):
+            state = table[state * num_classes + class_of(s[i])]
+            if accepting[state]:
+                starts[i] = 1
+        return starts
+
+    def find_match_spans(self, s):
+        '''
+        Returns the (start, end) of each leftmost-longest, non-overlapping, non-empty match in s, in time linear in the
+        length of s unless reversed() has too many states. With a prefilter, strings without the regex's required
+        literal are skipped, and if every match starts with a literal, str.find jumps between its occurrences instead
+        of making a backwards pass over s.
+        '''
+        stats.add('chars_scanned', len(s))
+        prefilter = self._prefilter_for(s)
+        if prefilter is not None:
+            if not prefilter.could_find(s):
+                return []
+            candidate_starts = prefilter.candidate_starts(s)
+            if candidate_starts is not None:
+                return self._find_match_spans_from(s, candidate_starts)
+        if self.reversed() is None:
+            return self._find_match_spans_from(s, range(len(s)))
+        return self._find_match_spans_after(s, 0)
+
+    def _find_match_spans_after(self, s, first):
+        '''
+        find_match_spans for the matches starting at or after first. One backwards pass of reversed() finds where
+        matches start, and the states from which each index can still be read on to an accepting state. Each match
+        is then scanned forwards only while it's in one of those, so stops at its end rather than looking past it,
+        and each char is read at most once by each pass.
+        '''
+        reversed_ = self.reversed()
+        table, num_classes, class_of, accepting = self.table, len(self.alphabet), self._class_of(s), self.accepting
+        reversed_table, reversed_accepting, reversed_sets = reversed_.table, reversed_.accepting, self._reversed_sets
+        num_states = self.num_states
+        # index -> reversed state, from first on, in bytes if they fit, as starts can then be found with one translate
+        if reversed_.num_states <= 256:
+            reversed_states = bytearray(len(s) + 1)
+        else:
+            reversed_states = array('i', [0]) * (len(s) + 1)
+        reversed_state = reversed_states[-1] = reversed_.entry
+        for i in range(len(s) - 1, first - 1, -1):
+            reversed_state = reversed_table[reversed_state * num_classes + class_of(s[i])]
+            reversed_states[i] = reversed_state
+        # Reversed state 0 is the empty set, so the indexes before first aren't starts
+        if reversed_.num_states <= 256:
+            starts = reversed_states.translate(bytes(reversed_accepting).ljust(256, b'\0'))
+        else:
+            starts = bytearray(map(reversed_accepting.__getitem__, reversed_states))
+
+        spans = []
+        start = starts.find(1, first)
+        while start != -1:
+            i, state = start, self.entry
+            while reversed_sets[reversed_states[i] * num_states + state]:
+                state = table[state * num_classes + class_of(s[i])]
+                i += 1
+                if accepting[state]:
+                    end = i
+            spans.append((start, end))
+            start = starts.find(1, end)
+        return spans
+
+    def search(self, s):
+        ''' True if DFA matches somewhere in s, including matching the empty string '''
+        stats.add('chars_scanned', len(s))
+        if self.accepting[self.entry]:
+            return True
+        prefilter = self._prefilter_for(s)
+        if prefilter is not None:
+            if not prefilter.could_find(s):
+                return False
+            candidate_starts = prefilter.candidate_starts(s)
+            if candidate_starts is not None:
+                return any(self.find_longest_match(s, start) not in (None, start) for start in candidate_starts)
+        if self.reversed() is None:
+            return self._search_forwards(s)
+        return self.match_starts(s).find(1) != -1
+
+    def _search_forwards(self, s):
+        '''search without reversed(): the states reached from every start so far are moved on together'''
+        table, num_classes, class_of, dead, accepting = (self.table, len(self.alphabet), self._class_of(s),
+            self.dead, self.accepting)
+        states = set()
+        for char in s:
+            char_class = class_of(char)
+            states.add(self.entry)
+            states = {table[state * num_classes + char_class] for state in states}
+            if any(accepting[state] for state in states):
+                return True
+            states = {state for state in states if not dead[state]}
+        return False
+
+    def _find_match_spans_from(self, s, candidate_starts):
+        '''
+        find_match_spans, given every index at which a match might start in order. Each start is scanned on its own,
+        so once the scans have read twice the length of s in all, the rest is found by _find_match_spans_after,
+        unless reversed() has too many states. Then the scans go on, and can take time quadratic in the length of s.
+        '''
+        spans = []
+        previous_end = 0
+        chars_left = 2 * len(s)
+        for start in candidate_starts:
+            if start < previous_end:
+                continue
+            if chars_left < 0 and self.reversed() is not None:
+                return spans + self._find_match_spans_after(s, previous_end)
+            end, read_to = self._longest_match(s, start)
+            chars_left -= read_to - start
+            if end not in (None, start):
+                spans.append((start, end))
+                previous_end = end
+        return spans
 
     def find_subset_matches(self, s):
-        ''' For each position in s, finds the longest possible match, returning a list of matches '''
-        matches = []
-        while s:
-            match = self.entry.find_longest_match('', s)
-            if match not in (None, ''): # None is non-match, '' is match of length 0 (e.g. a* against b)
-                if not any(match in m for m in matches): # subset of something we've previously found
-                    matches.append(match)
-            s = s[1:]
-        return matches
-
-def from_nfa(nfa):
-    '''Create a DFA from an NFA, i.e. return a version of nfa that is deterministic'''
+        ''' Returns each leftmost-longest, non-overlapping, non-empty match in s '''
+        return [s[start:end] for start, end in self.find_match_spans(s)]
+
+def _batches(sorted_lengths, max_cells):
+    '''
+    The (start, end) of each batch of strings of sorted_lengths, in order, with as many strings as fit in max_cells
+    when each is padded to the longest in its batch, or one string if that doesn't fit
+    '''
+    start = 0
+    while start < len(sorted_lengths):
+        low, high = start + 1, len(sorted_lengths) # binary search for the last end that fits
+        while low < high:
+            middle = (low + high + 1) // 2
+            if (middle - start) * int(sorted_lengths[middle - 1]) <= max_cells:
+                low = middle
+            else:
+                high = middle - 1
+        yield start, low
+        start = low
+
+def from_ast(regex, minimized=True, utf8=False):
+    '''
+    Create a DFA from an AST, with a prefilter built from the literals the regex requires. If utf8 is True, the DFA
+    matches bytes-like objects holding UTF-8, one byte at a time, with each char of the regex lowered to the bytes of
+    its encoding, so bytes can be matched without being decoded. Its match spans are then offsets in bytes.
+    '''
+    dfa = from_nfa(nfa_.from_ast(regex, alphabet_.from_ast(regex, utf8)), minimized)
+    dfa.prefilter = literals.from_ast(regex, 'utf-8' if utf8 else 'latin-1')
+    return dfa
+
+def from_nfa(nfa, minimized=True):
+    '''
+    Create a DFA from an NFA, i.e. return a version of nfa that is deterministic.
+    Uses the subset construction: each DFA state represents the frozenset of NFA states the NFA could be in, and
+    DFA states are looked up by that frozenset, so each set of NFA states becomes exactly one DFA state.
+    The result is passed through minimize() unless minimized is False.
+    '''
+    closures = {} # frozenset of NFA states -> its ε-closure
+
     def accessible_without_input(nfa_state_set):
         '''Aka ε-Closure. Finds all the states that can be found with epsilon edges'''
-        def _accessible_without_input(nfa_state, discovered):
-            if nfa_state in discovered:
-                return set()
-            discovered.add(nfa_state)
-            
-            for state in nfa_state.on_epsilon:
-                discovered = discovered.union(_accessible_without_input(state, discovered))
-            return discovered
-
-        on_epsilon = []
-        for state in nfa_state_set:
-            on_epsilon.extend(_accessible_without_input(state, set()))
-        return tuple(on_epsilon)
+        if nfa_state_set not in closures:
+            closure = set()
+            for state in nfa_state_set:
+                closure |= nfa.epsilon_closure(state)
+            closures[nfa_state_set] = frozenset(closure)
+        return closures[nfa_state_set]
 
     def all_possible_moves(nfa_state_set):
         ''' 
-        Returns a dictionary mapping a char to all states that can be traversed to with that char from nfa_state_set.
-        An nfa_state_set already includes all the states that can be reached without input, so all of the possible 
-        moves for a given char is defined as:
-            - Every state you can reach with that char (on_char[char] and on_unmatched_char)
+        Returns a dictionary mapping a char to all states that can be traversed to with that char from nfa_state_set,
+        and the states that can be traversed to with any other char. An nfa_state_set already includes all the states
+        that can be reached without input, so all of the possible moves for a given char is defined as:
+            - Every state you can reach with that char (on_char[char], or on_unmatched_char if char isn't in on_char)
             - Every state you can reach without input from those states (accessible_without_input(on_char[char]))
         '''
-        # Inverted states have on_unmatched_char set to a state; used to model AnyChar or an inverted CharClass
-        non_inverted_states, inverted_states = lpartition(nfa_state_set, lambda s: s.on_unmatched_char() == [])
-        on_char = DefaultDict(set)
+        chars = set()
         on_unmatched_char = set()
-        
-        # Non inverted states (move by char)
-        for state in non_inverted_states:
-            for char in state.on_char.keys():
-                on_char[char] = on_char[char].union(state.on_char[char])
-
-        # Inverted states (move by not char)
-        for state in inverted_states:
-            for char in [c for c in state.on_char.keys() if c not in on_char.keys()]:
-                assert state.on_char[char] == [], "An inverted state shouldn't have edges leading to real states"
-                on_char[char] = set([nfa_trap_state])
-
-        for state in inverted_states:
-            assert len(state.on_unmatched_char()) == 1, "An inverted state should have only one state to move to on_unmatched_char"
-            on_unmatched_char.add(state.on_unmatched_char()[0])
-            for char in [c for c in on_char.keys() if c not in state.on_char]:
-                on_char[char].add(state.on_unmatched_char()[0])
-
-        # Epsilon moves (move without input)
-        for char in on_char.keys():
-            on_char[char] = on_char[char].union(accessible_without_input(on_char[char]))
-        on_unmatched_char = on_unmatched_char.union(accessible_without_input(on_unmatched_char))
-
-        # Convert to tuples, as these are state_sets
-        return {c: tuple(on_char[c]) for c in on_char.keys()}, tuple(on_unmatched_char)
-
-    def create_dfa(nfa_state_sets, edges, start_state_set):
-        '''Create the DFA state graph based on the NFA state sets and edges identified'''
-        def find_dfa_state(state_set):
-            return find(lambda pair: pair[0] == state_set, dfa_states)[1]
-
-        # Create DFA state objects and edges
-        dfa_states = [(state_set, DFAState()) for state_set in nfa_state_sets]
-        for edge in edges:
-            from_state = find_dfa_state(edge.from_state_set)
-            to_state = find_dfa_state(edge.to_state_set)
-            if edge.char == 'default':
-                from_state.on_unmatched_char(to_state)
-            else:
-                from_state.add_edge(edge.char, to_state)
-
-        # Set accepting states
-        for state_set in nfa_state_sets:
-            if any(state.is_accepting for state in state_set):
-                find_dfa_state(state_set).is_accepting = True
+        for state in nfa_state_set:
+            chars.update(state.on_char.keys())
+            on_unmatched_char.update(state.on_unmatched_char())
 
-        return DFA(find_dfa_state(start_state_set))
+        on_char = {}
+        for char in chars:
+            targets = set()
+            for state in nfa_state_set:
+                targets.update(state.on_char[char])
+            on_char[char] = accessible_without_input(frozenset(targets))
 
-    def add_state_set(char, from_state_set, to_state_set):
-        if to_state_set not in processed_state_sets:
-            queued_state_sets.add(to_state_set)
-        edges.append(Edge(char, from_state_set, to_state_set))
+        return on_char, accessible_without_input(frozenset(on_unmatched_char))
 
-    nfa_trap_state = NFAState()
-    
-    start_state_set = accessible_without_input([nfa.entry])
-    processed_state_sets = []
-    queued_state_sets = set( (start_state_set,) )
+    def find_dfa_state(nfa_state_set):
+        '''Returns the DFA state for nfa_state_set, queueing it to be processed if it hasn't been seen before'''
+        if nfa_state_set not in dfa_states:
+            dfa_states[nfa_state_set] = DFAState(is_accepting=any(state.is_accepting for state in nfa_state_set),
+                pattern_ids=nfa_.pattern_ids(nfa_state_set))
+            queued_state_sets.append(nfa_state_set)
+        return dfa_states[nfa_state_set]
 
-    Edge = namedtuple('Edge', ['char', 'from_state_set', 'to_state_set'])
-    edges = []    
+    dfa_states = {} # frozenset of NFA states -> DFAState
+    queued_state_sets = []
+    entry = find_dfa_state(accessible_without_input(frozenset([nfa.entry])))
 
     while queued_state_sets:
         nfa_state_set = queued_state_sets.pop()
-        processed_state_sets.append(nfa_state_set)
+        dfa_state = dfa_states[nfa_state_set]
 
         on_char, on_unmatched_char = all_possible_moves(nfa_state_set)
-        add_state_set(char='default', from_state_set=nfa_state_set, to_state_set=on_unmatched_char)
-        for char in on_char.keys():
-            add_state_set(char=char, from_state_set=nfa_state_set, to_state_set=on_char[char])
+        dfa_state.on_unmatched_char(find_dfa_state(on_unmatched_char))
+        for char, to_state_set in on_char.items():
+            dfa_state.add_edge(char, find_dfa_state(to_state_set))
+
+    dfa = DFA(entry, nfa.alphabet)
+    stats.add('dfa_states_built', len(dfa_states))
+    stats.add('dfa_edges_built', sum(len(state.on_char) + 1 for state in dfa_states.values()))
+    dfa = minimize(dfa) if minimized else dfa
+    stats.add('dfa_states', len(dfa.states()))
+    return dfa
+
+def minimize(dfa):
+    '''
+    Returns an equivalent DFA with the fewest possible states, using Hopcroft's partition refinement algorithm.
+    Starts by partitioning states into accepting and non-accepting (split further by pattern_ids, for the DFA of a
+    RegexSet), then repeatedly splits the blocks of the partition
+    until every state in a block moves to the same block on each char. Each block then becomes a single state.
+    The chars include a 'default' pseudo-char for on_unmatched_char, which every state has, so the states that an
+    AnyChar or inverted CharClass lead to are split the same as any other.
+    The number of states merged away is stored in states_removed on the result.
+    '''
+    def move(state, char):
+        return state.on_unmatched_char() if char is DEFAULT else state.on_char[char]
+
+    DEFAULT = object()
+    states = dfa.states()
+    chars = set([DEFAULT])
+    for state in states:
+        chars.update(state.on_char.keys())
+
+    # Inverse of move(): char -> state -> states that move to it on char
+    moves_to = {char: {} for char in chars}
+    for state in states:
+        for char in chars:
+            moves_to[char].setdefault(move(state, char), []).append(state)
+
+    initial_blocks = {}
+    for state in states:
+        initial_blocks.setdefault((state.is_accepting, state.pattern_ids), set()).add(state)
+    blocks = list(initial_blocks.values())
+    block_of = {state: i for i, block in enumerate(blocks) for state in block}
+    waiting = set(range(len(blocks)))
+
+    while waiting:
+        splitter = list(blocks[waiting.pop()])
+        for char in chars:
+            # Group the states that move into splitter on char by the block they're in
+            touched = {}
+            for target in splitter:
+                for state in moves_to[char].get(target, ()):
+                    touched.setdefault(block_of[state], set()).add(state)
+
+            for i, moved_in in touched.items():
+                if len(moved_in) == len(blocks[i]):
+                    continue
+                # Split block i into the states that move into splitter (new block) and those that don't (block i)
+                blocks[i] -= moved_in
+                blocks.append(moved_in)
+                new_i = len(blocks) - 1
+                for state in moved_in:
+                    block_of[state] = new_i
+                if i in waiting or len(moved_in) <= len(blocks[i]):
+                    waiting.add(new_i)
+                else:
+                    waiting.add(i)
+
+    # One DFAState per block, with edges copied from any state in the block as they all move to the same blocks
+    new_states = [DFAState(next(iter(block)).is_accepting, next(iter(block)).pattern_ids) for block in blocks]
+    for block, new_state in zip(blocks, new_states):
+        state = next(iter(block))
+        default_state = new_states[block_of[state.on_unmatched_char()]]
+        new_state.on_unmatched_char(default_state)
+        for char, target in state.on_char.items():
+            if new_states[block_of[target]] is not default_state:
+                new_state.add_edge(char, new_states[block_of[target]])
 
-    return create_dfa(processed_state_sets, edges, start_state_set)
\ No newline at end of file
+    return DFA(new_states[block_of[dfa.entry]], dfa.alphabet, states_removed=len(states) - len(blocks), 
+        prefilter=dfa.prefilter)
@@ -48,10 +48,13 @@ def ast():
     MAX_DEPTH = 4
     ODDS_PRINTABLE_CHAR_OVER_CHAR_RANGE = 0.5
     ODDS_NO_MORE_CHARS_IN_CHAR_RANGE = 0.4
+    MAX_REPEAT_MIN = 2
+    MAX_LITERAL_LENGTH = 5
+    MAX_REPEAT_EXTRA = 2 # always bounded, as nested unbounded repeats can take the derivative method minutes to match
 
     def _ast(max_depth):
-        branch_adts = [adt.Or, adt.Sequence, adt.ZeroOrMore, adt.Optional]
-        leaf_adts = [adt.Char, adt.AnyChar, adt.CharClass]
+        branch_adts = [adt.Or, adt.Sequence, adt.ZeroOrMore, adt.Optional, adt.Repeat]
+        leaf_adts = [adt.Char, adt.Literal, adt.AnyChar, adt.CharClass]
         adt_choice = random.choice(branch_adts if max_depth > 1 else leaf_adts)
 
         if adt_choice == adt.Or:
@@ -62,8 +65,14 @@ def ast():
             return adt.ZeroOrMore(_ast(max_depth-1))
         elif adt_choice == adt.Optional:
             return adt.Optional(_ast(max_depth-1))
+        elif adt_choice == adt.Repeat:
+            min = random.randint(0, MAX_REPEAT_MIN)
+            max = min + random.randint(0, MAX_REPEAT_EXTRA)
+            return adt.Repeat(_ast(max_depth-1), min, max)
         elif adt_choice == adt.Char:
             return adt.Char(printable_char())
+        elif adt_choice == adt.Literal:
+            return adt.Literal(''.join(printable_char() for _ in range(random.randint(2, MAX_LITERAL_LENGTH))))
         elif adt_choice == adt.AnyChar:
             return adt.AnyChar()
         elif adt_choice == adt.CharClass:
@@ -96,8 +105,13 @@ def matching_str(regex):
         return ''.join(match)
     elif type(regex) == adt.Optional:
         return random.choice(['', matching_str(regex.regex)])
+    elif type(regex) == adt.Repeat:
+        max = regex.min + MAX_MATCHES_ZERO_OR_MORE if regex.max is None else regex.max
+        return ''.join(matching_str(regex.regex) for _ in range(random.randint(regex.min, max)))
     elif type(regex) == adt.Char:
         return regex.char
+    elif type(regex) == adt.Literal:
+        return regex.rest
     elif type(regex) == adt.AnyChar:
         return printable_char()
     elif type(regex) == adt.CharClass:
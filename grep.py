@@ -0,0 +1,70 @@
+'''Find the lines of a file that match a regex, without reading the file into memory'''
+import mmap
+
+_NEWLINE_COUNT_CHUNK = 1 << 20
+
+def _count_newlines(buffer, start, end):
+    '''Counts newlines in buffer[start:end], copying at most _NEWLINE_COUNT_CHUNK bytes at a time'''
+    count = 0
+    for chunk_start in range(start, end, _NEWLINE_COUNT_CHUNK):
+        count += buffer[chunk_start:min(chunk_start + _NEWLINE_COUNT_CHUNK, end)].count(b'\n')
+    return count
+
+def scan(buffer, compiled):
+    '''
+    Yields (line_number, line_start, spans) for each line of buffer, a bytes or mmap, that compiled matches somewhere
+    in. line_number counts from 1, line_start is the offset of the line in buffer, and spans are the (start, end) offsets
+    of the matches in the line, as from compiled.find_match_spans. Each line is matched through a memoryview, so is
+    not copied. If every match must contain a literal, only lines with that literal are matched, and buffer.find
+    skips straight from one to the next.
+    '''
+    required = None
+    if compiled.prefilter is not None:
+        required = compiled.prefilter.bytes_literals.required
+        if required is False:
+            return # no line can contain the literal
+    line_number = 1
+    position = 0 # start of the next line to look at
+
+    with memoryview(buffer) as view:
+        while position < len(buffer):
+            if required:
+                found = buffer.find(required, position)
+                if found == -1:
+                    return
+                line_start = max(buffer.rfind(b'\n', position, found) + 1, position)
+                line_number += _count_newlines(buffer, position, line_start)
+            else:
+                line_start = position
+
+            line_end = buffer.find(b'\n', line_start)
+            if line_end == -1:
+                line_end = len(buffer)
+            with view[line_start:line_end] as line:
+                spans = compiled.find_match_spans(line)
+            if spans:
+                yield line_number, line_start, spans
+            position = line_end + 1
+            line_number += 1
+
+def scan_file(path, compiled):
+    '''scan() over the file at path, memory-mapped so only the pages being scanned need to be in memory'''
+    with open(path, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # empty files can't be mapped
+            return
+        with buffer:
+            yield from scan(buffer, compiled)
+
+def find_in_file(path, compiled):
+    '''Yields (line_number, offset, match) for each match in the file at path, offset in the file and match as bytes'''
+    with open(path, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return
+        with buffer:
+            for line_number, line_start, spans in scan(buffer, compiled):
+                for start, end in spans:
+                    yield line_number, line_start + start, buffer[line_start + start:line_start + end]
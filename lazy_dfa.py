@@ -0,0 +1,83 @@
+'''A DFA built lazily from an NFA, keeping a bounded number of states'''
+import nfa as nfa_
+from utils import raise_if_not
+
+class LazyDFA:
+    '''
+    Runs the subset construction on demand: a DFA state (a frozenset of NFA states) and its edges are only built the
+    first time the input reaches them, then cached. At most max_states states are cached; when a new state is needed
+    and the cache is full, the whole cache is flushed and rebuilt from the state being moved to, so memory stays
+    bounded however many states the full DFA would have.
+    '''
+    def __init__(self, nfa, max_states=10000):
+        raise_if_not(max_states >= 3, 'max_states must leave room for the entry, trap and current states, got: '
+            '{0}'.format(max_states))
+        self.nfa = nfa
+        self.alphabet = nfa.alphabet
+        self.max_states = max_states
+        self.flushes = 0 # number of times the cache has been flushed
+        self._entry_set = nfa.epsilon_closure(nfa.entry)
+        self._flush()
+
+    def _flush(self):
+        self.state_sets = [] # state -> frozenset of NFA states
+        self.accepting = [] # state -> True if any of its NFA states are accepting
+        self.pattern_ids = [] # state -> pattern_ids of its NFA states, for the NFA of a RegexSet
+        self.on_char = [] # state -> {char class: state}
+        self._states = {} # frozenset of NFA states -> state
+        self.entry = self._state(self._entry_set)
+        self.trap = self._state(frozenset())
+
+    def _state(self, nfa_state_set):
+        '''Returns the state for nfa_state_set, creating it if it isn't cached'''
+        if nfa_state_set not in self._states:
+            self._states[nfa_state_set] = len(self.state_sets)
+            self.state_sets.append(nfa_state_set)
+            self.accepting.append(any(state.is_accepting for state in nfa_state_set))
+            self.pattern_ids.append(nfa_.pattern_ids(nfa_state_set))
+            self.on_char.append({})
+        return self._states[nfa_state_set]
+
+    def _add_edge(self, state, char_class):
+        '''Builds the edge from state on char_class, flushing the cache first if it has no room for a new state'''
+        targets = set()
+        for nfa_state in self.state_sets[state]:
+            for target in nfa_state.on_char[char_class]:
+                targets |= self.nfa.epsilon_closure(target)
+        target_set = frozenset(targets)
+
+        if target_set not in self._states and len(self.state_sets) >= self.max_states:
+            self.flushes += 1
+            self._flush()
+            return self._state(target_set) # state was flushed, so there's nowhere to record the edge
+
+        next_state = self._state(target_set)
+        self.on_char[state][char_class] = next_state
+        return next_state
+
+    def num_states(self):
+        return len(self.state_sets)
+
+    def next_state(self, state, char_class):
+        '''The state to move to from state on a char in char_class. States are only valid until the cache is flushed.'''
+        next_state = self.on_char[state].get(char_class)
+        if next_state is None:
+            next_state = self._add_edge(state, char_class)
+        return next_state
+
+    def matches(self, s):
+        ''' True if the NFA matches the entire string s '''
+        class_of = self.alphabet.class_of
+        state = self.entry
+        for char in s:
+            char_class = class_of(char)
+            next_state = self.on_char[state].get(char_class)
+            if next_state is None:
+                next_state = self._add_edge(state, char_class)
+            if next_state == self.trap:
+                return False
+            state = next_state
+        return self.accepting[state]
+
+def from_nfa(nfa, max_states=10000):
+    return LazyDFA(nfa, max_states)
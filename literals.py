@@ -0,0 +1,118 @@
+'''Finds the literal strings every match of a regex must contain, to rule out strings before running an automaton'''
+import adt
+from collections import namedtuple
+from os.path import commonprefix
+
+Literals = namedtuple('Literals', ['exact', 'prefix', 'suffix', 'required'])
+Literals.__doc__ = '''
+exact: the only string the regex matches, or None if it can match more than one
+prefix: a string every match starts with
+suffix: a string every match ends with
+required: a string every match contains, the longest found
+'''
+
+def _longest(*strs):
+    return max(strs, key=len)
+
+def _common_suffix(a, b):
+    return commonprefix([a[::-1], b[::-1]])[::-1]
+
+def _literals(regex):
+    if type(regex) == adt.Char:
+        return Literals(regex.char, regex.char, regex.char, regex.char)
+
+    elif type(regex) == adt.Literal:
+        return Literals(regex.rest, regex.rest, regex.rest, regex.rest)
+
+    elif type(regex) == adt.Epsilon:
+        return Literals('', '', '', '')
+
+    elif type(regex) == adt.Sequence:
+        a, b = _literals(regex.regex_a), _literals(regex.regex_b)
+        exact = a.exact + b.exact if a.exact is not None and b.exact is not None else None
+        prefix = a.exact + b.prefix if a.exact is not None else a.prefix
+        suffix = a.suffix + b.exact if b.exact is not None else b.suffix
+        # The end of a and the start of b are next to each other in every match
+        return Literals(exact, prefix, suffix, _longest(a.required, b.required, a.suffix + b.prefix, prefix, suffix))
+
+    elif type(regex) == adt.Or:
+        a, b = _literals(regex.regex_a), _literals(regex.regex_b)
+        exact = a.exact if a.exact == b.exact else None
+        prefix = commonprefix([a.prefix, b.prefix])
+        suffix = _common_suffix(a.suffix, b.suffix)
+        required = _longest(prefix, suffix, a.required if a.required == b.required else '')
+        return Literals(exact, prefix, suffix, required)
+
+    elif type(regex) == adt.Repeat and regex.min > 0:
+        repeated = _literals(regex.regex)
+        if repeated.exact is not None:
+            required = repeated.exact * regex.min
+            return Literals(required if regex.min == regex.max else None, required, required, required)
+        # With more than one copy, the end of one is next to the start of the next
+        between = repeated.suffix + repeated.prefix if regex.min > 1 else ''
+        return Literals(None, repeated.prefix, repeated.suffix, _longest(repeated.required, between))
+
+    elif type(regex) in (adt.ZeroOrMore, adt.Optional, adt.Repeat, adt.AnyChar, adt.CharClass, adt.NullRegex):
+        return Literals(None, '', '', '')
+
+    raise ValueError("Can't find literals for unknown type: {0}".format(regex))
+
+class Prefilter:
+    '''
+    Cheap checks, using the literals of a regex, that rule out strings the regex can't match. Strings can be str, or
+    bytes or bytearray, which are checked against the literals encoded with encoding: latin-1 for automata that read
+    each byte as the char with the same code point, or utf-8 for automata of a utf8 alphabet.
+    '''
+    def __init__(self, literals, encoding='latin-1'):
+        self.literals = literals
+        self.encoding = encoding
+        # For bytes, each literal encoded, None where the literal is None, or False if it can't be encoded
+        self.bytes_literals = Literals(*(self._to_bytes(literal) for literal in literals))
+
+    def _to_bytes(self, literal):
+        if literal is None:
+            return None
+        try:
+            return literal.encode(self.encoding)
+        except UnicodeEncodeError:
+            return False
+
+    def literals_for(self, s):
+        '''The literals to check s against: the str literals for a str, else the bytes literals'''
+        return self.literals if isinstance(s, str) else self.bytes_literals
+
+    def could_match(self, s):
+        '''False if the regex can't match the entire string s'''
+        literals = self.literals_for(s)
+        if literals.exact is not None:
+            return s == literals.exact
+        if False in literals:
+            return False
+        return s.startswith(literals.prefix) and s.endswith(literals.suffix) and literals.required in s
+
+    def could_find(self, s):
+        '''False if the regex can't match anywhere in s'''
+        required = self.literals_for(s).required
+        return required is not False and required in s
+
+    def candidate_starts(self, s, start=0):
+        '''
+        Every index from start onwards at which a match might start, in order, or None if the regex has no prefix so
+        a match might start anywhere.
+        '''
+        prefix = self.literals_for(s).prefix
+        if prefix is False:
+            return iter(())
+        if not prefix:
+            return None
+        return self._find_all(s, prefix, start)
+
+    @staticmethod
+    def _find_all(s, literal, start):
+        i = s.find(literal, start)
+        while i != -1:
+            yield i
+            i = s.find(literal, i + 1)
+
+def from_ast(regex, encoding='latin-1'):
+    return Prefilter(_literals(regex), encoding)
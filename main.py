@@ -1,24 +1,71 @@
 #!/usr/bin/env python3
+import argparse
 import parser
-import sys
 import nfa
 import dfa
+import derivative_dfa
+import lazy_dfa
+import grep
+import stats
 from utils import constructor_str
 
-if len(sys.argv) != 3:
-    print('Usage: main.py "<regular expression>" "<string to match>"')
-    sys.exit(1)
-regex_str = sys.argv[1]
-match_str = sys.argv[2]
+arg_parser = argparse.ArgumentParser(
+    description='Match a string against a regular expression, or find its matches in a file')
+arg_parser.add_argument('regex', help='regular expression')
+arg_parser.add_argument('string', nargs='?', help='string to match')
+arg_parser.add_argument('--file', help='file to find matches in, printed as line:offset:match')
+arg_parser.add_argument('--stats', action='store_true', help='print counters and the time spent in each phase')
+args = arg_parser.parse_args()
+if (args.string is None) == (args.file is None):
+    arg_parser.error('give either a string to match or --file, but not both')
 
-print('InputRegex:  ' + regex_str)
-ast = parser.parse_regex(regex_str)
+engine_stats = {} # engine -> Stats, with --stats
+
+def recording(engine):
+    '''Records the stats of the with block to engine's Stats, if --stats was given'''
+    if args.stats and engine not in engine_stats:
+        engine_stats[engine] = stats.Stats()
+    return stats.recording(engine_stats.get(engine))
+
+def print_stats():
+    for engine, recorded in engine_stats.items():
+        print('Stats ({0}):'.format(engine))
+        for line in str(recorded).splitlines():
+            print('    ' + line)
+
+with recording('parser'), stats.phase('parse'):
+    ast = parser.parse_regex(args.regex)
+
+if args.file is not None:
+    with recording('DFA'):
+        with stats.phase('dfa_build'):
+            dfa_ = dfa.from_ast(ast, utf8=True).compile()
+        with stats.phase('match'):
+            for line_number, offset, match in grep.find_in_file(args.file, dfa_):
+                print('{0}:{1}:{2}'.format(line_number, offset, match.decode('utf-8', errors='replace')))
+    print_stats()
+    raise SystemExit
+
+match_str = args.string
+print('InputRegex:  ' + args.regex)
 print('ParsedRegex: ' + ast.to_regex())
 print('AST: ' + constructor_str(ast))
 print('English: ' + ast.to_str_english())
-print('Full match (derivative): ' + str(ast.matches(match_str)))
-nfa_ = nfa.from_ast(ast)
-print('Full match (NFA): ' + str(nfa_.matches(match_str)))
-dfa_ = dfa.from_nfa(nfa_)
-print('Full match (DFA): ' + str(dfa_.matches(match_str)))
-print('Subsets matched: ' + str(dfa_.find_subset_matches(match_str)))
+with recording('derivative'), stats.phase('match'):
+    print('Full match (derivative): ' + str(ast.matches(match_str)))
+with recording('derivative DFA'), stats.phase('match'):
+    print('Full match (derivative DFA): ' + str(derivative_dfa.from_ast(ast).matches(match_str)))
+with recording('NFA'):
+    with stats.phase('nfa_build'):
+        nfa_ = nfa.from_ast(ast)
+    with stats.phase('match'):
+        print('Full match (NFA): ' + str(nfa_.matches(match_str)))
+with recording('lazy DFA'), stats.phase('match'):
+    print('Full match (lazy DFA): ' + str(lazy_dfa.from_nfa(nfa_).matches(match_str)))
+with recording('DFA'):
+    with stats.phase('dfa_build'):
+        dfa_ = dfa.from_ast(ast).compile()
+    with stats.phase('match'):
+        print('Full match (DFA): ' + str(dfa_.matches(match_str)))
+        print('Subsets matched: ' + str(dfa_.find_subset_matches(match_str)))
+print_stats()
@@ -1,36 +1,43 @@
 import adt
+import alphabet as alphabet_
+import stats
+import utf8
+from itertools import chain
 from utils import DefaultDict
 
 class NFAState:
+    '''Edges are keyed by the class of the char they match in the NFA's alphabet'''
     def __init__(self, is_accepting=False):
         self.is_accepting = is_accepting
         self.on_char = DefaultDict(list)
         self.on_epsilon = []
+        self.pattern_id = None # set on the accepting state of each pattern of a RegexSet
+        stats.add('nfa_states')
 
     def on_unmatched_char(self, state=None):
-        '''Used by AnyChar and inverted CharClass to avoid enumerating every possible character'''
+        '''Used by AnyChar to avoid enumerating every possible character'''
         if state:
             self.on_char.default_factory = lambda: [state]
         else:
             return self.on_char.default_factory()
 
-    def add_char_edge(self, char, state):
-        assert len(char) == 1, 'char must be a string of length 1, got {0}'.format(char)
-        if char in self.on_char:
-            self.on_char[char].append(state)
+    def add_char_edge(self, char_class, state):
+        if char_class in self.on_char:
+            self.on_char[char_class].append(state)
         else:
-            self.on_char[char] = [state]
+            self.on_char[char_class] = [state]
 
     def add_epsilon_edge(self, state):
         self.on_epsilon.append(state)
 
-    def matches(self, s):
-        return self._matches(s, [])
+    def matches(self, char_classes):
+        '''Backtracking search over a sequence of char classes; NFA.matches is preferred as it doesn't recurse'''
+        return self._matches(char_classes, set())
 
     def _matches(self, s, visited):
         if (self, len(s)) in visited:
             return False
-        visited.append( (self, len(s)) )
+        visited.add( (self, len(s)) )
 
         if len(s) == 0:
             if self.is_accepting:
@@ -41,17 +48,101 @@ class NFAState:
 
         return any(state._matches(s, visited) for state in self.on_epsilon)
 
+def pattern_ids(nfa_state_set):
+    '''The pattern_ids of the accepting states in nfa_state_set'''
+    return frozenset(state.pattern_id for state in nfa_state_set if state.is_accepting and state.pattern_id is not None)
+
 class NFA:
-    def __init__(self, entry, exit):
+    def __init__(self, entry, exit, alphabet):
         self.entry = entry
         self.exit = exit
+        self.alphabet = alphabet
+        self._closures = {}
+
+    def states(self):
+        '''All states reachable from entry'''
+        discovered = set([self.entry])
+        to_visit = [self.entry]
+        while to_visit:
+            state = to_visit.pop()
+            for target in chain(state.on_epsilon, state.on_unmatched_char(), *state.on_char.values()):
+                if target not in discovered:
+                    discovered.add(target)
+                    to_visit.append(target)
+        return discovered
+
+    def epsilon_closure(self, state):
+        '''
+        Aka accessible without input. Returns a frozenset of the states that can be reached from state with epsilon 
+        edges, including state itself. Cached, so the NFA must not be modified after its first use.
+        '''
+        stats.add('epsilon_closure_calls')
+        return self._epsilon_closure(state)
+
+    def _epsilon_closure(self, state):
+        '''epsilon_closure, without recording the call'''
+        if state not in self._closures:
+            closure = set([state])
+            to_visit = [state]
+            while to_visit:
+                for target in to_visit.pop().on_epsilon:
+                    if target not in closure:
+                        closure.add(target)
+                        to_visit.append(target)
+            self._closures[state] = frozenset(closure)
+        return self._closures[state]
 
     def matches(self, s):
-        return self.entry.matches(s)
-
-def from_ast(regex):
-    if type(regex) == adt.Or:
-        nfa_a, nfa_b = from_ast(regex.regex_a), from_ast(regex.regex_b)
+        '''
+        Thompson simulation: advances the set of all active states one char at a time, so runs in 
+        O(len(s) * number of states) without recursion.
+        '''
+        stats.add('chars_scanned', len(s))
+        closures = 1 # calls of epsilon_closure, recorded once at the end
+        active = self._epsilon_closure(self.entry)
+        for char in s:
+            char_class = self.alphabet.class_of(char)
+            next_active = set()
+            for state in active:
+                for target in state.on_char[char_class]:
+                    next_active |= self._epsilon_closure(target)
+                    closures += 1
+            active = next_active
+            if not active:
+                break
+        stats.add('epsilon_closure_calls', closures)
+        return any(state.is_accepting for state in active)
+
+    def matches_backtracking(self, s):
+        return self.entry.matches([self.alphabet.class_of(char) for char in s])
+
+def _utf8_nfa(code_point_ranges, alphabet):
+    '''NFA that matches the UTF-8 encoding of a code point in code_point_ranges, a byte at a time'''
+    entry = NFAState()
+    exit = NFAState(is_accepting=True)
+    for start, end in code_point_ranges:
+        for sequence in utf8.byte_sequences(start, end):
+            state = entry
+            for i, (low, high) in enumerate(sequence):
+                target = exit if i == len(sequence) - 1 else NFAState()
+                for byte_class in alphabet.classes_of_range(chr(low), chr(high)):
+                    state.add_char_edge(byte_class, target)
+                state = target
+    return NFA(entry, exit, alphabet)
+
+def from_ast(regex, alphabet=None):
+    '''
+    Thompson's construction. Edges are keyed by char class in alphabet, which defaults to alphabet.from_ast(regex).
+    If the alphabet is utf8, each char is lowered to the bytes of its UTF-8 encoding, with a state between each byte.
+    '''
+    if alphabet is None:
+        alphabet = alphabet_.from_ast(regex)
+
+    if alphabet.utf8 and type(regex) in (adt.Char, adt.AnyChar, adt.CharClass):
+        return _utf8_nfa(utf8.code_point_ranges(regex), alphabet)
+
+    elif type(regex) == adt.Or:
+        nfa_a, nfa_b = from_ast(regex.regex_a, alphabet), from_ast(regex.regex_b, alphabet)
         
         entry = NFAState()
         exit = NFAState(is_accepting=True)
@@ -63,64 +154,97 @@ def from_ast(regex):
         nfa_a.exit.add_epsilon_edge(exit)
         nfa_b.exit.add_epsilon_edge(exit)
 
-        return NFA(entry, exit)
+        return NFA(entry, exit, alphabet)
 
     elif type(regex) == adt.Sequence:
-        nfa_a, nfa_b = from_ast(regex.regex_a), from_ast(regex.regex_b)
+        nfa_a, nfa_b = from_ast(regex.regex_a, alphabet), from_ast(regex.regex_b, alphabet)
 
         nfa_a.exit.is_accepting = False
         nfa_b.exit.is_accepting = True
         nfa_a.exit.add_epsilon_edge(nfa_b.entry)
         
-        return NFA(nfa_a.entry, nfa_b.exit)
+        return NFA(nfa_a.entry, nfa_b.exit, alphabet)
 
-    elif type(regex) == adt.ZeroOrMore:
-        nfa = from_ast(regex.regex)
+    elif type(regex) in (adt.ZeroOrMore, adt.Optional):
+        nfa = from_ast(regex.regex, alphabet)
 
-        nfa.exit.add_epsilon_edge(nfa.entry)
-        nfa.entry.add_epsilon_edge(nfa.exit)
-
-        return nfa
+        # New states around the regex's NFA, as an edge skipping it from its own entry would also be taken after
+        # looping back to that entry, from inside a ZeroOrMore
+        entry = NFAState()
+        exit = NFAState(is_accepting=True)
+        nfa.exit.is_accepting = False
 
-    elif type(regex) == adt.Optional:
-        nfa = from_ast(regex.regex)
+        entry.add_epsilon_edge(nfa.entry)
+        entry.add_epsilon_edge(exit)
+        nfa.exit.add_epsilon_edge(exit)
+        if type(regex) == adt.ZeroOrMore:
+            nfa.exit.add_epsilon_edge(nfa.entry)
 
-        nfa.entry.add_epsilon_edge(nfa.exit)
+        return NFA(entry, exit, alphabet)
 
-        return nfa
+    elif type(regex) == adt.Repeat:
+        # An NFA has no counters, so the regex's NFA is copied: min copies that must match, then max-min that can
+        # each be skipped to the exit, or one that loops if max is None
+        entry = NFAState()
+        exit = NFAState(is_accepting=True)
+        state = entry
+        for i in range(regex.min if regex.max is None else regex.max):
+            nfa = from_ast(regex.regex, alphabet)
+            nfa.exit.is_accepting = False
+            if i >= regex.min:
+                state.add_epsilon_edge(exit)
+            state.add_epsilon_edge(nfa.entry)
+            state = nfa.exit
+        if regex.max is None:
+            nfa = from_ast(adt.ZeroOrMore(regex.regex), alphabet)
+            nfa.exit.is_accepting = False
+            state.add_epsilon_edge(nfa.entry)
+            state = nfa.exit
+        state.add_epsilon_edge(exit)
+        return NFA(entry, exit, alphabet)
+
+    elif type(regex) == adt.Literal:
+        # A chain of a state per char, and one to end on, rather than two states per char as for Chars in a Sequence
+        chars = regex.rest
+        if alphabet.utf8:
+            encoded = utf8.encode(chars)
+            if encoded is None: # a surrogate, which no bytes match
+                return NFA(NFAState(), NFAState(is_accepting=True), alphabet)
+            chars = map(chr, encoded)
+        entry = state = NFAState()
+        for char in chars:
+            target = NFAState()
+            state.add_char_edge(alphabet.class_of(char), target)
+            state = target
+        state.is_accepting = True
+        return NFA(entry, state, alphabet)
 
     elif type(regex) == adt.Char:
         entry = NFAState()
         exit = NFAState(is_accepting=True)
-        entry.add_char_edge(regex.char, exit)
-        return NFA(entry, exit)
+        entry.add_char_edge(alphabet.class_of(regex.char), exit)
+        return NFA(entry, exit, alphabet)
 
     elif type(regex) == adt.AnyChar:
         entry = NFAState()
         exit = NFAState(is_accepting=True)
         entry.on_unmatched_char(exit)
-        return NFA(entry, exit) 
+        return NFA(entry, exit, alphabet) 
 
     elif type(regex) == adt.CharClass:
         entry = NFAState()
         exit = NFAState(is_accepting=True)
 
-        if not regex.invert:
-            for str_or_char_range in regex.strs_or_char_ranges:
-                for char in str_or_char_range:
-                    entry.add_char_edge(char, exit)
-        else:
-            entry.on_unmatched_char(exit)
-            for str_or_char_range in regex.strs_or_char_ranges:
-                for char in str_or_char_range:
-                    entry.on_char[char] = []
+        for start, end in regex.ranges:
+            for char_class in alphabet.classes_of_range(chr(start), chr(end)):
+                entry.add_char_edge(char_class, exit)
 
-        return NFA(entry, exit)
+        return NFA(entry, exit, alphabet)
 
     elif type(regex) == adt.Epsilon:
         entry = NFAState()
         exit = NFAState(is_accepting=True)
         entry.add_epsilon_edge(exit)
-        return NFA(entry, exit)
+        return NFA(entry, exit, alphabet)
 
     raise ValueError("Can't generate NFA for unknown type: {0}".format(regex))
\ No newline at end of file
@@ -0,0 +1,171 @@
+'''
+Finds the matches of a CompiledDFA in a large string with several processes, each scanning a chunk of it. The results
+are exactly those of CompiledDFA.find_match_spans, found in two parallel passes, each followed by a sequential pass
+over the per-chunk results that only reads the string where a match crosses a chunk boundary:
+    1. The reversed DFA is run backwards over each chunk from every state it could be in at the chunk's end, as that
+       depends on the chunks after it. Runs that reach the same state are the same from then on, so usually only a
+       few chars are read more than once. The chunks' state mappings are then composed from the last chunk to the
+       first, giving the state each chunk really ends in, and so where in it the matches start.
+    2. Each chunk is scanned forwards for leftmost-longest matches, from its first match start. A sequential scan
+       reaching the chunk from a match that crossed into it is at a later position, but it agrees with the chunk's
+       matches from the first one that the chunk's scan found from at or before that position.
+This only pays off when the reversed DFA's runs meet soon after a chunk's end, and few matches cross chunk boundaries.
+Otherwise, as for (aa)*b over a long run of a's, where the runs never meet and a match can span the whole string,
+the chunks' scans would do more work than a single scan. So once the runs have taken MAX_UNCONVERGED steps in all
+without meeting, or the sequential pass has read more than a worker's share of s, the rest of s is scanned as by
+find_match_spans, and the worst case takes a little longer than calling it in the first place. Regexes whose reversed
+DFA has more than MAX_REVERSED_STATES states, as there is a run from each, are scanned as by find_match_spans from the
+start.
+'''
+import os
+import serialization
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+
+MIN_CHUNK_SIZE = 1 << 20 # smaller strings are scanned in one process, as starting processes takes longer
+MAX_UNCONVERGED = 1 << 16 # steps the reversed DFA's runs from every state take, in all, before giving up on them
+MAX_REVERSED_STATES = 256
+
+_compiled = None # the CompiledDFA in a worker process
+
+def _init_worker(serialized):
+    global _compiled
+    _compiled = serialization.loads(serialized)
+
+def _reverse_scan(chunk):
+    '''
+    Runs _compiled.reversed() backwards over chunk, from each of its states. Returns (end_states, path_starts,
+    starts): end_states[state] is the state at the start of chunk when starting in state, path_starts[state] the
+    indexes at which a match starts, read before the runs from every state met, and starts a bytearray that is 1 at
+    each index at which a match starts after they met. Returns None if they haven't met within MAX_UNCONVERGED steps.
+    '''
+    reversed_ = _compiled.reversed()
+    table, num_classes, class_of, accepting = (reversed_.table, len(_compiled.alphabet), _compiled._class_of(chunk),
+        reversed_.accepting)
+    states = list(range(reversed_.num_states))
+    path_starts = [[] for _ in states]
+    i = len(chunk) - 1
+    while i >= 0 and len(set(states)) > 1:
+        if (len(chunk) - i) * len(states) > MAX_UNCONVERGED:
+            return None
+        char_class = class_of(chunk[i])
+        for path, state in enumerate(states):
+            state = table[state * num_classes + char_class]
+            states[path] = state
+            if accepting[state]:
+                path_starts[path].append(i)
+        i -= 1
+
+    starts = bytearray(len(chunk))
+    if i >= 0:
+        state = states[0]
+        for i in range(i, -1, -1):
+            state = table[state * num_classes + class_of(chunk[i])]
+            if accepting[state]:
+                starts[i] = 1
+        states = [state] * len(states)
+    return states, path_starts, starts
+
+def _forward_scan(chunk, starts, is_last):
+    '''
+    The (start, end) of each leftmost-longest match in chunk, from its first match start, given starts, as from
+    _reverse_scan. Returns (spans, unfinished): if a match may run past the end of chunk, the scan stops there, and
+    unfinished is its start, else None.
+    '''
+    table, num_classes, class_of, dead, accepting = (_compiled.table, len(_compiled.alphabet),
+        _compiled._class_of(chunk), _compiled.dead, _compiled.accepting)
+    spans = []
+    start = starts.find(1)
+    while start != -1:
+        state, end = _compiled.entry, None
+        for i in range(start, len(chunk)):
+            state = table[state * num_classes + class_of(chunk[i])]
+            if dead[state]:
+                break
+            if accepting[state]:
+                end = i + 1
+        else:
+            if not is_last:
+                return spans, start
+        spans.append((start, end))
+        start = starts.find(1, end)
+    return spans, None
+
+def _chunk_bounds(length, chunk_size):
+    return [(start, min(start + chunk_size, length)) for start in range(0, length, chunk_size)]
+
+def _chunk(s, start, end):
+    chunk = s[start:end]
+    return bytes(chunk) if isinstance(chunk, memoryview) else chunk # memoryviews can't be sent to other processes
+
+def find_match_spans(s, compiled, workers=None, chunk_size=None):
+    '''
+    The same as compiled.find_match_spans(s), scanning s in chunks of chunk_size chars with a pool of workers
+    processes. s is a str or bytes-like object, including an mmap. workers defaults to the number of CPUs, and
+    chunk_size to enough for 4 chunks per worker, but no fewer than MIN_CHUNK_SIZE. Each chunk is copied to a worker
+    once for each pass.
+    '''
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(-(-len(s) // (workers * 4)), MIN_CHUNK_SIZE)
+    prefilter = compiled._prefilter_for(s)
+    reversed_ = compiled.reversed()
+    if (len(s) <= chunk_size or (prefilter is not None and not prefilter.could_find(s)) or reversed_ is None or
+            reversed_.num_states > MAX_REVERSED_STATES):
+        return compiled.find_match_spans(s)
+    bounds = _chunk_bounds(len(s), chunk_size)
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(serialization.dumps(compiled),)) as executor:
+        reverse_scans = []
+        for reverse_scan in executor.map(_reverse_scan, (_chunk(s, start, end) for start, end in bounds)):
+            if reverse_scan is None:
+                executor.shutdown(cancel_futures=True)
+                return compiled.find_match_spans(s)
+            reverse_scans.append(reverse_scan)
+        starts = [None] * len(bounds)
+        state = reversed_.entry # the end of s
+        for k in range(len(bounds) - 1, -1, -1):
+            end_states, path_starts, starts[k] = reverse_scans[k]
+            for i in path_starts[state]:
+                starts[k][i] = 1
+            state = end_states[state]
+
+        is_last = [k == len(bounds) - 1 for k in range(len(bounds))]
+        forward_scans = list(executor.map(_forward_scan, (_chunk(s, start, end) for start, end in bounds), starts,
+            is_last))
+
+    spans = []
+    position = 0 # where a sequential scan would look for the next match from
+    chars_left = len(s) // workers # to read in the sequential pass, before it's no faster than one scan
+    for (chunk_start, chunk_end), chunk_starts, (chain, unfinished) in zip(bounds, starts, forward_scans):
+        chain = [(start + chunk_start, end + chunk_start) for start, end in chain]
+        unfinished = None if unfinished is None else unfinished + chunk_start
+        position = max(position, chunk_start)
+        while True:
+            if chain is not None:
+                # The chunk's scan looked for span j from chain[j - 1]'s end. If that's at or before position, there
+                # are no match starts between them, so the sequential scan finds span j too, and the rest after it.
+                j = bisect_left(chain, (position,))
+                if (chain[j - 1][1] if j else chunk_start) <= position:
+                    spans.extend(chain[j:])
+                    position = max(position, chain[-1][1]) if chain else position
+                    if unfinished is None:
+                        break
+                    chain = None # the rest of the chunk is scanned sequentially, from the unfinished match
+            start = chunk_starts.find(1, position - chunk_start)
+            if start == -1:
+                break
+            if chars_left < 0:
+                return spans + compiled._find_match_spans_after(s, position)
+            start += chunk_start
+            end, read_to = compiled._longest_match(s, start)
+            chars_left -= read_to - start
+            spans.append((start, end))
+            position = end
+            if position >= chunk_end:
+                break
+    return spans
+
+def find_subset_matches(s, compiled, workers=None, chunk_size=None):
+    '''The same as compiled.find_subset_matches(s), found by find_match_spans'''
+    return [s[start:end] for start, end in find_match_spans(s, compiled, workers, chunk_size)]
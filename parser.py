@@ -1,11 +1,51 @@
 import adt
 import adt_fancy_constructors
+from utils import raise_if
 
 def parse_regex(input_str):
     return _RegexParser(input_str).parse()
 
+# Kinds of token, each a (kind, value, position) tuple
+_BASE = 'base' # value is the Regex of a <base>
+_QUANTIFIER = 'quantifier' # value is the (min, max) repeats, max None if unbounded
+_OPEN, _CLOSE, _OR = '(', ')', '|'
+
+_QUANTIFIERS = {'*': (0, None), '+': (1, None), '?': (0, 1)}
+
+def _join_literals(factors):
+    '''factors with each run of Chars and Literals joined into one Literal'''
+    joined, run = [], []
+    for factor in factors + [None]:
+        if type(factor) in (adt.Char, adt.Literal):
+            run.append(factor.char if type(factor) == adt.Char else factor.rest)
+            continue
+        if run:
+            joined.append(adt.Literal(''.join(run)))
+            run = []
+        if factor is not None:
+            joined.append(factor)
+    return joined
+
+def _sequence(factors):
+    factors = _join_literals(factors)
+    if len(factors) == 0:
+        return adt.Epsilon()
+    elif len(factors) == 1:
+        return factors[0]
+    return adt_fancy_constructors.sequence_tree_from_regexes(factors)
+
+def _or(terms):
+    if len(terms) == 1:
+        return terms[0]
+    return adt_fancy_constructors.or_tree_from_regexes(terms)
+
 class _RegexParser:
-    '''Recursive descent parser to construct an AST of type Regex from a regular expression string'''
+    '''
+    Parser to construct an AST of type Regex from a regular expression string. Neither pass recurses, so there's no
+    limit on how long or deeply nested a pattern can be: the string is split into tokens in one pass, then the tokens
+    are built into the AST with a stack of the groups still open. Sequences and alternations are built as balanced
+    trees, so the AST is only about as deep as the log of the number of factors or alternatives.
+    '''
     #
     # Interface
     #
@@ -14,12 +54,38 @@ class _RegexParser:
         self.input_index = 0 # current position in input_str
 
     def parse(self):
-        ast = self._regex()
+        '''
+        <regex> ::= <term> { '|' <term> }
+        <term> ::= { <factor> }
+        <factor> ::= ( <base> | '(' <regex> ')' ) { <quantifier> }
+        '''
+        tokens = self._tokens()
         self.input_index = 0 # reset state
-        return ast
+
+        groups = [] # (terms, factors) of each group enclosing the current one
+        terms, factors = [], [] # of the current group: the terms before the last '|', and the factors after it
+        for kind, value, position in tokens:
+            if kind == _BASE:
+                factors.append(value)
+            elif kind == _QUANTIFIER:
+                factors[-1] = adt.Repeat(factors[-1], *value)
+            elif kind == _OR:
+                terms.append(_sequence(factors))
+                factors = []
+            elif kind == _OPEN:
+                groups.append((terms, factors))
+                terms, factors = [], []
+            elif kind == _CLOSE:
+                raise_if(not groups, 'Unbalanced parentheses: unexpected ) at position: {0}'.format(position))
+                group = _or(terms + [_sequence(factors)])
+                terms, factors = groups.pop()
+                factors.append(group)
+
+        raise_if(groups, 'Unbalanced parentheses: {0} ( not closed'.format(len(groups)))
+        return _or(terms + [_sequence(factors)])
 
     #
-    # Recursive descent parsing internals
+    # Tokenizing internals
     #
     def _peek(self):
         '''Returns the next item of input_str without consuming it'''
@@ -44,65 +110,40 @@ class _RegexParser:
     #
     # Context-free grammar types
     #
-    def _regex(self):
+    def _tokens(self):
         '''
-        <regex> ::= <term> [ '|' <regex> ]
+        <token> ::= '(' | ')' | '|' | <quantifier> | <base>
+        <quantifier> ::= '*' | '+' | '?' | '{' <bounds> '}', only after a <base>, ')' or <quantifier>, otherwise
+            the char is a <base>
         '''
-        term = self._term()
-
-        if self._more() and self._peek() == '|':
-            self._eat('|')
-            regex = self._regex()
-            return adt.Or(term, regex)
-        return term
-
-    def _term(self):
-        '''<term> ::= { <factor> }'''
-        factors = []
-        while self._more() and self._peek() not in (')', '|'):
-            factors.append(self._factor())
-
-        if len(factors) == 0:
-            return adt.Epsilon()
-        elif len(factors) == 1:
-            return factors[0]
-        return adt_fancy_constructors.sequence_tree_from_regexes(factors)
-
-    def _factor(self):
-        '''<factor> ::= <base> { '*' | '+' | '?' | '{' <quantifier> '}' }'''
-        base = self._base()
- 
-        while self._more() and self._peek() in ('*', '+', '?', '{'):
+        tokens = []
+        quantifiable = False # whether the last token was a <base>, ')' or <quantifier>
+        while self._more():
+            position = self.input_index
             char = self._next()
-            if char == '*':
-                base = adt.ZeroOrMore(base)
-            elif char == '+':
-                base = adt.Sequence(base, adt.ZeroOrMore(base)) # a+ = aa*
-            elif char == '?':
-                base = adt.Optional(base)
-            elif char == '{':
-                base = self._quantifier(base)
+            if char in (_OPEN, _CLOSE, _OR):
+                tokens.append((char, None, position))
+                quantifiable = char == _CLOSE
+                continue
+
+            if quantifiable and char in _QUANTIFIERS:
+                tokens.append((_QUANTIFIER, _QUANTIFIERS[char], position))
+            elif quantifiable and char == '{':
+                tokens.append((_QUANTIFIER, self._bounds(), position))
                 self._eat('}')
             else:
-                raise ValueError('Expected: *, + or ?, got: {0}, at position'.format(char, self.input_index))
-
-        return base
+                tokens.append((_BASE, self._base(char), position))
+            quantifiable = True
+        return tokens
 
-    def _base(self):
+    def _base(self, char):
         '''
         <base> ::= '.'
                 |  '\' <backslash-char>
-                |  '(' <regex> ')'  
                 |  '[' <char-class> ']'
                 |  <char>
         '''
-        char = self._next()
-
-        if char == '(':
-            regex = self._regex()
-            self._eat(')')
-            return regex
-        elif char == '[':
+        if char == '[':
             char_class = self._char_class()
             self._eat(']')
             return char_class
@@ -112,22 +153,20 @@ class _RegexParser:
             return self._backslash_char()
         return adt.Char(char)
 
-    def _quantifier(self, regex):
+    def _bounds(self):
         '''
-        <quantifier> ::= <int> [ ',' [ <int> ] ]
+        <bounds> ::= <int> [ ',' [ <int> ] ]
         '''
-        lower_bound = self._int()
-        repeated = [regex] * lower_bound # a{3} = aaa
+        lower_bound = upper_bound = self._int() # a{3}
 
         if self._peek() != '}':
             self._eat(',')
             if self._peek() == '}':
-                repeated.append(adt.ZeroOrMore(regex)) # a{3,} = aaaa*
+                upper_bound = None # a{3,}
             else:
-                upper_bound = self._int()
-                repeated.extend([adt.Optional(regex)] * (upper_bound-lower_bound)) # a{3,5} = aaaa?a?
+                upper_bound = self._int() # a{3,5}
 
-        return adt_fancy_constructors.sequence_tree_from_regexes(repeated)
+        return lower_bound, upper_bound
 
     def _int(self):
         ''' [0-9]+ '''
@@ -144,19 +183,16 @@ class _RegexParser:
         char = self._next()
 
         if str.lower(char) in ('d', 's', 'w'): # char class shorthand
+            invert = str.isupper(char)
             if str.lower(char) == 'd':
-                char_class = adt.CharClass(invert=False, strs_or_char_ranges=[adt.CharRange('0', '9')])
+                return adt.CharClass(invert=invert, strs_or_char_ranges=[adt.CharRange('0', '9')])
             elif str.lower(char) == 's':
-                char_class = adt.CharClass(invert=False, strs_or_char_ranges=[' ', '\t', '\r', '\n', '\f'])
+                return adt.CharClass(invert=invert, strs_or_char_ranges=[' ', '\t', '\r', '\n', '\f'])
             elif str.lower(char) == 'w':
-                char_class = adt.CharClass(invert=False, strs_or_char_ranges=[
+                return adt.CharClass(invert=invert, strs_or_char_ranges=[
                     adt.CharRange('A', 'Z'), adt.CharRange('a', 'z'), adt.CharRange('0', '9'), '_'])
             else:
                 raise ValueError('Expected d, s or w, got: {0}'.format(char))
-
-            if str.isupper(char):
-                char_class.invert = True
-            return char_class
         return adt.Char(char) # escaped char
 
     def _char_class(self):
@@ -179,7 +215,10 @@ class _RegexParser:
                     chars.append(char)
                     chars.append('-')
                 else:
-                    chars.append(adt.CharRange(start=char, end=self._next()))
+                    end = self._next()
+                    if end == '\\':
+                        end = self._next() # escaped
+                    chars.append(adt.CharRange(start=char, end=end))
             else:
                 chars.append(char)
 
@@ -0,0 +1,135 @@
+'''Compiles regex strings to DFAs, caching the most recently used so each is only compiled once'''
+import alphabet
+import dfa
+import literals
+import nfa
+import parser
+import stats as stats_
+from collections import OrderedDict
+from threading import Lock
+from utils import raise_if
+
+DEFAULT_CACHE_SIZE = 512
+
+class Pattern:
+    '''
+    A regex string parsed and compiled to a CompiledDFA. If utf8 is True, the DFA matches UTF-8 bytes-like objects
+    instead of str, as for dfa.from_ast. If stats is True, compiling and every match are recorded to self.stats, a
+    stats.Stats, else self.stats is None and nothing is recorded.
+    '''
+    def __init__(self, pattern, utf8=False, minimized=True, stats=False):
+        self.pattern = pattern
+        self.utf8 = utf8
+        self.stats = stats_.Stats() if stats else None
+        with stats_.recording(self.stats):
+            with stats_.phase('parse'):
+                self.ast = parser.parse_regex(pattern)
+            with stats_.phase('nfa_build'):
+                nfa_ = nfa.from_ast(self.ast, alphabet.from_ast(self.ast, utf8))
+            with stats_.phase('dfa_build'):
+                dfa_ = dfa.from_nfa(nfa_, minimized)
+                dfa_.prefilter = literals.from_ast(self.ast, 'utf-8' if utf8 else 'latin-1')
+            with stats_.phase('dfa_compile'):
+                self.dfa = dfa_.compile()
+
+    def _recorded(self, method, s):
+        if self.stats is None:
+            return method(s)
+        with stats_.recording(self.stats), stats_.phase('match'):
+            return method(s)
+
+    def matches(self, s):
+        ''' True if the pattern matches the entire string s '''
+        return self._recorded(self.dfa.matches, s)
+
+    def matches_many(self, strings):
+        ''' numpy array of whether the pattern matches each entire string of strings. Needs numpy. '''
+        return self._recorded(self.dfa.matches_many, strings)
+
+    def search(self, s):
+        ''' True if the pattern matches somewhere in s '''
+        return self._recorded(self.dfa.search, s)
+
+    def find_match_spans(self, s):
+        return self._recorded(self.dfa.find_match_spans, s)
+
+    def find_subset_matches(self, s):
+        return self._recorded(self.dfa.find_subset_matches, s)
+
+class PatternCache:
+    '''
+    A cache of at most max_size Patterns, keyed by the pattern string and the options it was compiled with. When it's
+    full, the least recently used Pattern is evicted. Safe to use from several threads: lookups hold a lock, but
+    compiling doesn't, so two threads that miss on the same key at once both compile it, and both get the copy that
+    was cached first, unless it's evicted meanwhile. The copies' ASTs are the same nodes anyway, as nodes are
+    interned under a lock.
+    '''
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        raise_if(max_size < 0, 'max_size must not be negative, got: {0}'.format(max_size))
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._patterns = OrderedDict() # (pattern, utf8, minimized, stats) -> Pattern, least recently used first
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def compile(self, pattern, utf8=False, minimized=True, stats=False):
+        '''Returns the Pattern for pattern, compiling it if it isn't cached'''
+        key = (pattern, utf8, minimized, stats)
+        with self._lock:
+            compiled = self._patterns.get(key)
+            if compiled is not None:
+                self._patterns.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        compiled = Pattern(pattern, utf8, minimized, stats)
+        with self._lock:
+            if key in self._patterns: # compiled by another thread in the meantime
+                return self._patterns[key]
+            self._patterns[key] = compiled
+            self._evict()
+        return compiled
+
+    def resize(self, max_size):
+        '''Changes max_size, evicting the least recently used Patterns if there are more than max_size'''
+        raise_if(max_size < 0, 'max_size must not be negative, got: {0}'.format(max_size))
+        with self._lock:
+            self.max_size = max_size
+            self._evict()
+
+    def _evict(self):
+        while len(self._patterns) > self.max_size:
+            self._patterns.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        '''Removes every Pattern and resets the counters'''
+        with self._lock:
+            self._patterns.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        '''Dict of the counters, with the number of Patterns cached and max_size'''
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._patterns), 'max_size': self.max_size}
+
+_cache = PatternCache()
+
+def compile(pattern, utf8=False, minimized=True, stats=False):
+    '''Returns the Pattern for the regex string pattern, from the module's cache if it was compiled before'''
+    return _cache.compile(pattern, utf8, minimized, stats)
+
+def set_cache_size(max_size):
+    _cache.resize(max_size)
+
+def cache_stats():
+    return _cache.stats()
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,102 @@
+'''Match a string against many regexes at once'''
+import aho_corasick
+import alphabet as alphabet_
+import dfa
+import lazy_dfa
+import literals
+import nfa
+import parser
+
+class RegexSet:
+    '''
+    Combines many ASTs into one automaton: an NFA whose entry has an epsilon edge to each regex's NFA, where the
+    accepting state of regex i has pattern_id i. Each DFA state then carries the pattern_ids of the regexes it accepts,
+    so a single pass over a string finds every regex that matches it. Regexes are referred to by their index.
+    '''
+    def __init__(self, regexes, max_search_states=10000):
+        self.regexes = list(regexes)
+        self.alphabet = alphabet_.from_asts(self.regexes)
+        self.max_search_states = max_search_states
+        self._dfa = None
+
+        # For search(), regexes that require a literal are found with one Aho-Corasick pass over their literals
+        required = [literals.from_ast(regex).literals.required for regex in self.regexes]
+        self._with_literal = [pattern_id for pattern_id in range(len(self.regexes)) if required[pattern_id]]
+        self._without_literal = [pattern_id for pattern_id in range(len(self.regexes)) if not required[pattern_id]]
+        self._aho_corasick = aho_corasick.from_words(required[pattern_id] for pattern_id in self._with_literal)
+        self._dfas = {} # pattern_id -> CompiledDFA of just that regex, to confirm Aho-Corasick candidates
+        self._search_dfa = None
+
+    def _nfa(self, pattern_ids, unanchored):
+        entry = nfa.NFAState()
+        if unanchored: # entry loops on every char, so each regex can start matching anywhere
+            entry.on_unmatched_char(entry)
+        for pattern_id in pattern_ids:
+            nfa_ = nfa.from_ast(self.regexes[pattern_id], self.alphabet)
+            nfa_.exit.pattern_id = pattern_id
+            entry.add_epsilon_edge(nfa_.entry)
+        return nfa.NFA(entry, None, self.alphabet) # no single exit, as there's an accepting state per regex
+
+    def compile(self):
+        '''The CompiledDFA of all the regexes, built on the first call'''
+        if self._dfa is None:
+            self._dfa = dfa.from_nfa(self._nfa(range(len(self.regexes)), unanchored=False)).compile()
+        return self._dfa
+
+    def matches(self, s):
+        '''Returns the frozenset of indexes of the regexes that match the entire string s'''
+        compiled = self.compile()
+        table, num_classes, class_of, dead = compiled.table, len(self.alphabet), self.alphabet.class_of, compiled.dead
+        state = compiled.entry
+        for char in s:
+            state = table[state * num_classes + class_of(char)]
+            if dead[state]:
+                return frozenset()
+        return compiled.pattern_ids[state]
+
+    def candidates(self, s):
+        '''
+        Returns the set of indexes of the regexes that might match somewhere in s: those whose required literal is in
+        s, found with one Aho-Corasick pass, and those without a required literal.
+        '''
+        return set(self._with_literal[i] for i in self._aho_corasick.find(s)) | set(self._without_literal)
+
+    def search(self, s):
+        '''
+        Returns the frozenset of indexes of the regexes that match somewhere in s. Regexes with a required literal
+        are only run, each with its own DFA, if one pass of Aho-Corasick finds their literal in s. The rest are run
+        together in one pass of a DFA that is built lazily, as every regex can start matching at any position, with
+        its size bounded by max_search_states.
+        '''
+        found = set()
+        for pattern_id in self._aho_corasick.find(s):
+            pattern_id = self._with_literal[pattern_id]
+            if pattern_id not in self._dfas:
+                self._dfas[pattern_id] = dfa.from_ast(self.regexes[pattern_id]).compile()
+            if self._dfas[pattern_id].search(s):
+                found.add(pattern_id)
+        if self._without_literal:
+            found |= self._search_without_literal(s)
+        return frozenset(found)
+
+    def _search_without_literal(self, s):
+        if self._search_dfa is None:
+            self._search_dfa = lazy_dfa.from_nfa(self._nfa(self._without_literal, unanchored=True), 
+                self.max_search_states)
+        search_dfa, class_of = self._search_dfa, self.alphabet.class_of
+
+        state = search_dfa.entry
+        found = search_dfa.pattern_ids[state]
+        for char in s:
+            if len(found) == len(self._without_literal):
+                break
+            state = search_dfa.next_state(state, class_of(char))
+            if search_dfa.pattern_ids[state]:
+                found = found | search_dfa.pattern_ids[state]
+        return found
+
+def from_asts(regexes, max_search_states=10000):
+    return RegexSet(regexes, max_search_states)
+
+def from_regexes(regex_strs, max_search_states=10000):
+    return RegexSet([parser.parse_regex(regex_str) for regex_str in regex_strs], max_search_states)
@@ -0,0 +1,115 @@
+'''
+Saves CompiledDFAs in a compact binary format, so they can be built once and loaded quickly, via mmap, at startup.
+All numbers are little-endian. A file is:
+    header: magic b'RDFA', version (uint16), flags (uint8), padding (1 byte), and the number of states, number of
+        char classes and entry state (uint32 each)
+    the alphabet's boundaries, a uint32 per class
+    the table, an int32 per state and class, starting 4-byte aligned so it can be used in place
+    accepting, then dead, a byte (0 or 1) per state
+    the number of states with pattern_ids (uint32), then for each: the state, the number of pattern_ids, and the
+        pattern_ids (uint32 each)
+    if the DFA has a prefilter, its exact, prefix, suffix and required literals: each a length (int32, -1 for None)
+        followed by that many bytes of UTF-8
+'''
+import alphabet as alphabet_
+import dfa
+import literals
+import mmap
+import struct
+import sys
+from array import array
+from utils import raise_if, raise_if_not
+
+MAGIC = b'RDFA'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sHBxIII')
+_UINT32 = struct.Struct('<I')
+_INT32 = struct.Struct('<i')
+_UTF8 = 1 # flags
+_PREFILTER = 2
+
+def dumps(compiled):
+    '''Returns compiled, a CompiledDFA, as bytes'''
+    num_states, num_classes = compiled.num_states, len(compiled.alphabet)
+    flags = (_UTF8 if compiled.alphabet.utf8 else 0) | (_PREFILTER if compiled.prefilter is not None else 0)
+    parts = [_HEADER.pack(MAGIC, VERSION, flags, num_states, num_classes, compiled.entry)]
+
+    boundaries = array('I', compiled.alphabet.boundaries)
+    table = array('i', compiled.table)
+    if sys.byteorder == 'big':
+        boundaries.byteswap()
+        table.byteswap()
+    parts += [boundaries.tobytes(), table.tobytes()]
+    parts += [bytes(map(bool, compiled.accepting)), bytes(map(bool, compiled.dead))]
+
+    pattern_ids = [(state, sorted(ids)) for state, ids in enumerate(compiled.pattern_ids or ()) if ids]
+    parts.append(_UINT32.pack(len(pattern_ids)))
+    for state, ids in pattern_ids:
+        parts.append(struct.pack('<II{0}I'.format(len(ids)), state, len(ids), *ids))
+
+    if compiled.prefilter is not None:
+        for literal in compiled.prefilter.literals:
+            if literal is None:
+                parts.append(_INT32.pack(-1))
+            else:
+                encoded = literal.encode('utf-8', 'surrogatepass')
+                parts += [_INT32.pack(len(encoded)), encoded]
+    return b''.join(parts)
+
+def dump(compiled, path):
+    '''Writes compiled, a CompiledDFA, to the file at path'''
+    with open(path, 'wb') as f:
+        f.write(dumps(compiled))
+
+def loads(data):
+    '''
+    Returns the CompiledDFA saved in data, a bytes-like object. On little-endian machines the table isn't copied: it's
+    a memoryview of data, so data must not be changed while the CompiledDFA is in use.
+    '''
+    raise_if(len(data) < _HEADER.size, 'Not a serialized DFA: too short')
+    magic, version, flags, num_states, num_classes, entry = _HEADER.unpack_from(data, 0)
+    raise_if_not(magic == MAGIC, 'Not a serialized DFA: magic is {0}'.format(bytes(magic)))
+    raise_if_not(version == VERSION, "Can't load serialized DFA version {0}, only {1}".format(version, VERSION))
+    view = memoryview(data).cast('B')
+    offset = _HEADER.size
+
+    def take(length):
+        nonlocal offset
+        raise_if(offset + length > len(view), 'Serialized DFA is truncated')
+        offset += length
+        return view[offset - length:offset]
+
+    boundaries = array('I')
+    boundaries.frombytes(take(4 * num_classes))
+    table = take(4 * num_states * num_classes)
+    if sys.byteorder == 'little':
+        table = table.cast('i')
+    else:
+        boundaries.byteswap()
+        table = array('i', table.tobytes())
+        table.byteswap()
+    accepting = [bool(byte) for byte in take(num_states)]
+    dead = [bool(byte) for byte in take(num_states)]
+
+    pattern_ids = [frozenset()] * num_states
+    for _ in range(_UINT32.unpack(take(4))[0]):
+        state, length = struct.unpack('<II', take(8))
+        pattern_ids[state] = frozenset(struct.unpack('<{0}I'.format(length), take(4 * length)))
+
+    prefilter = None
+    if flags & _PREFILTER:
+        literals_ = []
+        for _ in literals.Literals._fields:
+            length = _INT32.unpack(take(4))[0]
+            literals_.append(None if length == -1 else str(take(length), 'utf-8', 'surrogatepass'))
+        prefilter = literals.Prefilter(literals.Literals(*literals_), 'utf-8' if flags & _UTF8 else 'latin-1')
+    raise_if(offset != len(view), 'Serialized DFA has {0} unexpected bytes at the end'.format(len(view) - offset))
+
+    alphabet = alphabet_.Alphabet(list(boundaries), utf8=bool(flags & _UTF8))
+    return dfa.CompiledDFA(table, accepting, alphabet, entry, pattern_ids, prefilter, dead)
+
+def load(path):
+    '''Returns the CompiledDFA saved in the file at path, which is memory-mapped rather than read'''
+    with open(path, 'rb') as f:
+        return loads(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
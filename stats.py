@@ -0,0 +1,65 @@
+'''
+Opt-in counters and timers, to find which phase of compiling or matching a pattern the time goes to. Nothing is
+recorded unless a Stats is being recorded to, and the engines only check for one once per call, never per char.
+Recording is per thread (and per asyncio task), so Patterns recording their own stats can be used from several at once.
+
+Counters:
+    nfa_states: states of the NFAs built
+    epsilon_closure_calls: calls of NFA.epsilon_closure, in building DFAs and in NFA.matches
+    dfa_states_built, dfa_edges_built: states and edges built by the subset construction, before minimizing
+    dfa_states: states left after minimizing
+    derivative_calls: derivatives taken by Regex.matches and DerivativeDFA
+    derivative_cache_hits: chars DerivativeDFA moved on with a memoized edge rather than a new derivative
+    chars_scanned: the lengths of the strings matched. The DFAs stop early once no match is possible, so may read fewer.
+'''
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar('current', default=None) # the Stats being recorded to
+
+def current():
+    '''The Stats being recorded to in this thread, or None'''
+    return _current.get()
+
+class Stats:
+    '''Counters, and the total wall time spent in each phase, in the order they were first recorded'''
+    def __init__(self):
+        self.counters = {}
+        self.seconds = {}
+
+    def add(self, counter, n=1):
+        self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def __str__(self):
+        lines = ['{0}: {1}'.format(counter, n) for counter, n in self.counters.items()]
+        lines += ['{0} time: {1:.6f}s'.format(phase, seconds) for phase, seconds in self.seconds.items()]
+        return '\n'.join(lines)
+
+@contextmanager
+def recording(stats):
+    '''Records to stats, a Stats or None to record nothing, within the with block'''
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def phase(name):
+    '''Adds the wall time spent in the with block to phase name of the Stats being recorded to, if any'''
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.seconds[name] = stats.seconds.get(name, 0) + time.perf_counter() - start
+
+def add(counter, n=1):
+    '''Adds n to counter of the Stats being recorded to, if any'''
+    stats = _current.get()
+    if stats is not None:
+        stats.add(counter, n)
@@ -1,6 +1,9 @@
 import unittest
+import sys
+import threading
 from adt import *
 from adt_fancy_constructors import *
+from parser import parse_regex
 
 class TestAdt(unittest.TestCase):
     def test_matches(self):
@@ -85,4 +88,113 @@ class TestAdt(unittest.TestCase):
                 Sequence(Char('a'), ZeroOrMore(Char('c')))
             ).derivative('a'), 
             Or(Char('b'), ZeroOrMore(Char('c')))
-        )
\ No newline at end of file
+        )
+
+    def test_repeat(self):
+        self.assertTrue(Repeat(Char('a'), 2, 3).matches('aa'))
+        self.assertTrue(Repeat(Char('a'), 2, 3).matches('aaa'))
+        self.assertFalse(Repeat(Char('a'), 2, 3).matches('a'))
+        self.assertFalse(Repeat(Char('a'), 2, 3).matches('aaaa'))
+        self.assertTrue(Repeat(Char('a'), 2, None).matches('a' * 20))
+
+        self.assertEqual(Repeat(Char('a'), 2, 3).derivative('a'), Sequence(Epsilon(), Repeat(Char('a'), 1, 2)))
+        self.assertEqual(Repeat(Char('a'), 1, 2).derivative('a'), Optional(Char('a')))
+        self.assertEqual(Repeat(Char('a'), 3, None).derivative('a'), Repeat(Char('a'), 2, None))
+        self.assertEqual(Repeat(Char('a'), 2, 3).derivative('b'), NullRegex())
+
+        self.assertEqual(Repeat(Char('a'), 1, 1), Char('a'))
+        self.assertEqual(Repeat(Char('a'), 0, None), ZeroOrMore(Char('a')))
+        self.assertEqual(Repeat(Optional(Char('a')), 2, 3), Repeat(Char('a'), 0, 3))
+        self.assertEqual(Repeat(NullRegex(), 0, 3), Epsilon())
+        self.assertRaises(ValueError, Repeat, Char('a'), 3, 2)
+        self.assertEqual(Repeat(Char('a'), 3, 5).to_regex(), 'a{3,5}')
+        self.assertEqual(Repeat(char_sequence_from_str('ab'), 3, None).to_regex(), '(ab){3,}')
+
+    def test_literal(self):
+        self.assertTrue(Literal('abc').matches('abc'))
+        self.assertFalse(Literal('abc').matches('ab'))
+        self.assertTrue(Sequence(Literal('ab'), ZeroOrMore(Char('c'))).matches('abcc'))
+        self.assertFalse(Sequence(Literal('ab'), ZeroOrMore(Char('c'))).matches('acc'))
+
+        self.assertEqual(Literal('abc').derivative('b'), NullRegex())
+        self.assertEqual(Literal('abc').derivative('a').derivative('b'), Char('c'))
+        self.assertEqual(Literal('abc', 3), Epsilon())
+        self.assertEqual(Literal('a+b?').to_regex(), 'a\\+b\\?')
+        self.assertEqual(ZeroOrMore(Literal('ab')).to_regex(), '(ab)*')
+
+    def test_hash_consing(self):
+        self.assertIs(char_sequence_from_str('ab'), Literal('ab'))
+        self.assertIs(Literal('abc').derivative('a'), Literal('abc', 1))
+        self.assertIs(
+            CharClass(True, ['a', CharRange('c', 'e')]),
+            CharClass(True, ('a', CharRange('c', 'e')))
+        )
+        self.assertIsNot(CharClass(True, ['a', 'b']), CharClass(False, ['a', 'b']))
+        self.assertIs(CharRange('a', 'z'), CharRange('a', 'z'))
+        self.assertIs(Epsilon(), Epsilon())
+
+        self.assertIs(Or(Char('a'), Char('b')), Or(Char('b'), Char('a')))
+        self.assertEqual(hash(ZeroOrMore(Char('a'))), hash(ZeroOrMore(Char('a'))))
+        self.assertEqual(len({Optional(Char('a')), Optional(Char('a')), Char('a')}), 2)
+
+    def test_or_normalized(self):
+        a, b, c = Char('a'), Char('b'), Char('c')
+        self.assertIs(Or(Or(a, b), c), Or(a, Or(b, c)))
+        self.assertIs(Or(Or(c, a), Or(b, a)), Or(Or(a, b), c))
+        self.assertIs(Or(a, Or(a, b)), Or(a, b))
+        self.assertIs(Or(Or(b, a), Or(a, b)), Or(a, b))
+        # Deeper than the recursion limit, so the operands' sort keys can't be computed recursively
+        deep = char_sequence_from_str('x')
+        for _ in range(sys.getrecursionlimit() + 100):
+            deep = Sequence(ZeroOrMore(a), Sequence(deep, b))
+        self.assertIs(Or(deep, c), Or(c, deep))
+
+    def test_hash_consing_from_threads(self):
+        texts = ['thread{0}'.format(i) for i in range(2000)]
+        results = []
+        barrier = threading.Barrier(8)
+        def build():
+            barrier.wait()
+            results.append([Sequence(Literal(text), Repeat(Char(text[-1]), 1, 3)) for text in texts])
+        threads = [threading.Thread(target=build) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for built in results[1:]:
+            for a, b in zip(results[0], built):
+                self.assertIs(a, b)
+
+    def test_char_range_iteration(self):
+        char_range = CharRange('a', 'c')
+        self.assertEqual([(a, b) for a in char_range for b in char_range][:4],
+            [('a', 'a'), ('a', 'b'), ('a', 'c'), ('b', 'a')])
+
+    def test_char_class_ranges(self):
+        self.assertEqual(CharClass(False, ['c', CharRange('a', 'c'), 'd', CharRange('x', 'z'), 'y']).ranges,
+            ((ord('a'), ord('d')), (ord('x'), ord('z'))))
+        self.assertIs(CharClass(False, ['b', 'a']), CharClass(False, [CharRange('a', 'b')]))
+        self.assertIs(CharClass(False, ['a', 'a']), Char('a'))
+        self.assertIs(CharClass(True, [CharRange('\0', '`'), CharRange('b', chr(sys.maxunicode))]), Char('a'))
+
+        digits = CharClass(False, [CharRange('0', '9')])
+        self.assertIn('5', digits)
+        self.assertNotIn('a', digits)
+        self.assertNotIn('5', digits.complement())
+        self.assertIn(chr(sys.maxunicode), digits.complement())
+        self.assertIs(digits.complement(), CharClass(True, [CharRange('0', '9')]))
+        self.assertTrue(digits.complement().invert)
+
+        letters = CharClass(False, [CharRange('a', 'z')])
+        self.assertIs(digits.union(letters), CharClass(False, [CharRange('a', 'z'), CharRange('0', '9')]))
+        self.assertIs(digits.union(Char('_')), CharClass(False, [CharRange('0', '9'), '_']))
+        self.assertIs(letters.intersection(CharClass(False, [CharRange('x', '~')])), CharClass(False, [CharRange('x', 'z')]))
+        self.assertIs(letters.intersection(CharClass(False, ['a', CharRange('m', 'o'), '0'])),
+            CharClass(False, ['a', CharRange('m', 'o')]))
+        self.assertIs(letters.intersection(AnyChar()), letters)
+        self.assertEqual(letters.intersection(digits).ranges, ())
+
+    def test_char_class_to_regex(self):
+        for char_class in (CharClass(False, ['^', 'a']), CharClass(True, ['^']), CharClass(False, ['-', 'a', ']', '\\']),
+                CharClass(False, [CharRange('+', '-'), CharRange(']', '^')]), CharClass(True, [])):
+            self.assertIs(parse_regex(char_class.to_regex()), char_class, char_class.to_regex())
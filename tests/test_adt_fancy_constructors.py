@@ -19,11 +19,27 @@ class TestAdtFancyConstructors(unittest.TestCase):
 
         self.assertEqual(
             sequence_tree_from_regexes([Char('a'), Char('b'), Char('c'), Char('d')]),
-            Sequence(Sequence(Sequence(Char('a'), Char('b')), Char('c')), Char('d'))
+            Sequence(Sequence(Char('a'), Char('b')), Sequence(Char('c'), Char('d')))
+        )
+
+        self.assertEqual(
+            sequence_tree_from_regexes([Char('a'), Char('b'), Char('c'), Char('d'), Char('e')]),
+            Sequence(Sequence(Sequence(Char('a'), Char('b')), Sequence(Char('c'), Char('d'))), Char('e'))
+        )
+
+    def test_or_tree_from_regexes(self):
+        with self.assertRaises(ValueError):
+            or_tree_from_regexes([Char('a')])
+
+        self.assertEqual(
+            or_tree_from_regexes([Char('a'), Char('b'), Char('c'), Char('d')]),
+            Or(Or(Char('a'), Char('b')), Or(Char('c'), Char('d')))
         )
 
     def test_char_sequence_from_str(self):
         self.assertEqual(
             char_sequence_from_str('abcd'),
-            Sequence(Sequence(Sequence(Char('a'), Char('b')), Char('c')), Char('d'))
-        )
\ No newline at end of file
+            Literal('abcd')
+        )
+        self.assertEqual(char_sequence_from_str('a'), Char('a'))
+        self.assertEqual(char_sequence_from_str(''), Epsilon())
\ No newline at end of file
@@ -0,0 +1,25 @@
+import unittest
+from aho_corasick import from_words
+
+class TestAhoCorasick(unittest.TestCase):
+    def test_find(self):
+        aho_corasick = from_words(['he', 'she', 'his', 'hers'])
+        self.assertEqual(aho_corasick.find('ushers'), set([0, 1, 3]))
+        self.assertEqual(aho_corasick.find('his'), set([2]))
+        self.assertEqual(aho_corasick.find('hi s'), set())
+        self.assertEqual(aho_corasick.find(''), set())
+
+    def test_find_overlapping(self):
+        aho_corasick = from_words(['abcd', 'bc', 'c', 'bcx'])
+        self.assertEqual(aho_corasick.find('abcx'), set([1, 2, 3]))
+        self.assertEqual(aho_corasick.find('xabcd'), set([0, 1, 2]))
+
+    def test_find_fail_links(self):
+        aho_corasick = from_words(['aab', 'ab'])
+        self.assertEqual(aho_corasick.find('aaab'), set([0, 1]))
+
+    def test_find_matches_brute_force(self):
+        words = ['ERROR', 'RR', 'refused', 'use', 'sed', '@', 'd@']
+        aho_corasick = from_words(words)
+        for s in ('ERROR refused', 'ERR', 'user@host', 'used@', 'xxERRORxx', 'rrefusedd@'):
+            self.assertEqual(aho_corasick.find(s), set(i for i, word in enumerate(words) if word in s), s)
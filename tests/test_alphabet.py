@@ -0,0 +1,48 @@
+import unittest
+import sys
+import alphabet
+import nfa
+import dfa
+from adt import *
+from parser import parse_regex
+
+class TestAlphabet(unittest.TestCase):
+    def test_from_ast(self):
+        alphabet_ = alphabet.from_ast(parse_regex('[b-d]x|.'))
+        self.assertEqual(alphabet_.boundaries, [0, ord('b'), ord('e'), ord('x'), ord('y')])
+        self.assertEqual(len(alphabet_), 5)
+
+        self.assertEqual(alphabet_.class_of('a'), 0)
+        self.assertEqual(alphabet_.class_of('\0'), 0)
+        self.assertEqual(alphabet_.class_of('b'), 1)
+        self.assertEqual(alphabet_.class_of('d'), 1)
+        self.assertEqual(alphabet_.class_of('w'), 2)
+        self.assertEqual(alphabet_.class_of('x'), 3)
+        self.assertEqual(alphabet_.class_of('ሴ'), 4)
+        self.assertEqual(alphabet_.classes_of_range('b', 'x'), range(1, 4))
+
+        self.assertEqual(alphabet_.code_point_range(1), (ord('b'), ord('d')))
+        self.assertEqual(alphabet_.code_point_range(4), (ord('y'), sys.maxunicode))
+        self.assertEqual(alphabet_.representative(3), 'x')
+
+    def test_from_asts(self):
+        alphabet_ = alphabet.from_asts([Char('a'), Char('b'), CharClass(True, [CharRange('a', 'c')])])
+        self.assertEqual(alphabet_.boundaries, [0, ord('a'), ord('b'), ord('c'), ord('d')])
+
+    def test_from_ast_max_code_point(self):
+        alphabet_ = alphabet.from_ast(Char(chr(sys.maxunicode)))
+        self.assertEqual(alphabet_.boundaries, [0, sys.maxunicode])
+        self.assertEqual(alphabet_.class_of(chr(sys.maxunicode)), 1)
+
+    def test_wide_range(self):
+        dfa_ = dfa.from_nfa(nfa.from_ast(parse_regex('[\u0000-￿]x')))
+        self.assertEqual(len(dfa_.alphabet), 4)
+        self.assertTrue(dfa_.matches('ሴx'))
+        self.assertFalse(dfa_.matches('\U00012345x'))
+
+    def test_from_ast_utf8(self):
+        # é is 0xC3 0xA9 in UTF-8
+        alphabet_ = alphabet.from_ast(parse_regex('aé'), utf8=True)
+        self.assertTrue(alphabet_.utf8)
+        self.assertEqual(alphabet_.boundaries, [0, ord('a'), ord('b'), 0xA9, 0xAA, 0xC3, 0xC4])
+        self.assertEqual(len(alphabet_.byte_classes()), 256)
@@ -0,0 +1,29 @@
+import unittest
+import benchmark
+
+class TestBenchmark(unittest.TestCase):
+    def test_run(self):
+        results = benchmark.run(['counted'], [10, 100])
+        phases = [(result['pattern'], result['phase'], result['engine'], result['size']) for result in results]
+        pattern = '[a-z]{2,8}(-[a-z]{2,8})*'
+        self.assertEqual(phases[:9], [(pattern, 'parse', None, None), (pattern, 'nfa_build', None, None),
+            (pattern, 'dfa_build', None, None), (pattern, 'match', 'derivative', 5), (pattern, 'match', 'nfa', 5),
+            (pattern, 'match', 'dfa', 5), (pattern, 'match', 'derivative', 95), (pattern, 'match', 'nfa', 95),
+            (pattern, 'match', 'dfa', 95)])
+        self.assertTrue(all(result['family'] == 'counted' and result['seconds'] >= 0 for result in results))
+
+    def test_inputs_match(self):
+        for family, patterns in benchmark.FAMILIES.items():
+            for pattern, make_input in patterns:
+                dfa_ = benchmark.dfa.from_ast(benchmark.parser.parse_regex(pattern)).compile()
+                for size in (10, 1000):
+                    self.assertTrue(dfa_.matches(make_input(size)), '{0} {1}'.format(family, size))
+
+    def test_compare(self):
+        baseline = [{'family': 'f', 'pattern': 'a', 'phase': 'match', 'engine': 'dfa', 'size': 10, 'seconds': 0.1},
+            {'family': 'f', 'pattern': 'a', 'phase': 'parse', 'engine': None, 'size': None, 'seconds': 0.001}]
+        slower = dict(baseline[0], seconds=0.2)
+        noise = dict(baseline[1], seconds=0.003)
+        new = dict(baseline[0], size=100, seconds=1.0)
+        self.assertEqual(benchmark.compare([slower, noise, new], baseline), [(slower, 0.1)])
+        self.assertEqual(benchmark.compare([slower], baseline, threshold=3), [])
@@ -0,0 +1,41 @@
+import unittest
+import codegen
+import dfa
+from alphabet import Alphabet
+from array import array
+from parser import parse_regex
+
+class TestCodegen(unittest.TestCase):
+    def test_same_as_table(self):
+        regexes = ('\\w+@\\w+\\.\\w+', 'a|ab|abc', '(a|b)*c', '[^a]b*', 'a.c|b', '(ab)*b?', 'x*', '[0-9a-f]{2}', 'ሴ+')
+        strs = ('', 'a', 'ab', 'abc', 'me@host.com', 'bbbc', 'xbbb', 'aሴc', 'ababb', 'xxx', '9f', 'ሴሴ', 'a@b.')
+        for regex in regexes:
+            compiled = dfa.from_ast(parse_regex(regex)).compile()
+            generated = codegen.from_compiled_dfa(compiled)
+            for s in strs:
+                self.assertEqual(generated.matches(s), compiled.matches(s), '{0} against {1}'.format(regex, s))
+                for start in range(len(s) + 1):
+                    self.assertEqual(generated.find_longest_match(s, start), compiled.find_longest_match(s, start),
+                        '{0} against {1} from {2}'.format(regex, s, start))
+
+    def test_utf8(self):
+        compiled = dfa.from_ast(parse_regex('caf.|[α-ω]+'), utf8=True).compile()
+        generated = codegen.from_dfa(dfa.from_ast(parse_regex('caf.|[α-ω]+'), utf8=True))
+        for s in ('café', 'cafe', 'αβγ', 'αβγδ!', ''):
+            self.assertEqual(generated.matches(s.encode('utf-8')), compiled.matches(s.encode('utf-8')), s)
+        self.assertEqual(generated.find_longest_match('x αβ!'.encode('utf-8'), 2), 6)
+
+    def test_never_matches(self):
+        generated = codegen.from_compiled_dfa(dfa.CompiledDFA(array('i', [0]), [False], Alphabet([0])))
+        self.assertFalse(generated.matches(''))
+        self.assertIsNone(generated.find_longest_match('abc', 0))
+
+    def test_cached(self):
+        compiled = dfa.from_ast(parse_regex('a+b')).compile()
+        generated = codegen.from_compiled_dfa(compiled)
+        self.assertIs(codegen.from_compiled_dfa(compiled), generated)
+        self.assertIn('def matches(s):', generated.source)
+
+    def test_too_many_states(self):
+        compiled = dfa.from_ast(parse_regex('(a|b)*a(a|b){9}')).compile()
+        self.assertRaises(ValueError, codegen.from_compiled_dfa, compiled)
@@ -0,0 +1,50 @@
+import random
+import unittest
+from derivative_dfa import from_ast
+from adt import *
+from parser import parse_regex
+
+class TestDerivativeDfa(unittest.TestCase):
+    def test_matches(self):
+        dfa = from_ast(parse_regex('a(b|c)*d'))
+        self.assertTrue(dfa.matches('ad'))
+        self.assertTrue(dfa.matches('abcbd'))
+        self.assertFalse(dfa.matches('a'))
+        self.assertFalse(dfa.matches('abde'))
+        self.assertFalse(dfa.matches(''))
+
+    def test_matches_empty(self):
+        self.assertTrue(from_ast(Epsilon()).matches(''))
+        self.assertFalse(from_ast(NullRegex()).matches(''))
+        self.assertFalse(from_ast(NullRegex()).matches('a'))
+
+    def test_states_are_reused(self):
+        dfa = from_ast(parse_regex('(ab)*'))
+        self.assertTrue(dfa.matches('ab' * 1000))
+        num_states = dfa.num_states()
+        self.assertTrue(dfa.matches('abab'))
+        self.assertFalse(dfa.matches('aba'))
+        self.assertEqual(dfa.num_states(), num_states, 'no new states for inputs already seen')
+        self.assertLessEqual(num_states, 3) # (ab)*, b(ab)* and the trap state
+
+    def test_transitions_are_memoized(self):
+        dfa = from_ast(parse_regex('a+'))
+        dfa.matches('aaa')
+        self.assertIn(dfa.alphabet.class_of('a'), dfa.on_char[dfa.entry])
+        dfa.regexes[dfa.entry] = NullRegex() # further derivatives of the entry would now be wrong
+        self.assertTrue(dfa.matches('aaa'))
+
+    def test_long_input(self):
+        dfa = from_ast(parse_regex('.+@.+\..+'))
+        self.assertTrue(dfa.matches('a' * 10000 + '@' + 'b' * 10000 + '.com'))
+        self.assertFalse(dfa.matches('a' * 10000 + '@' + 'b' * 10000))
+
+    def test_states_stop_growing(self):
+        # Without Ors being normalized, each derivative of these is a new Or, so a new state
+        rng = random.Random(0)
+        for regex, chars in (('.*a.*', 'ab'), ('(a|b)*a(a|b)*', 'ab'), ('(\\w|\\s)*x(\\w|\\s)*', 'abx \t')):
+            dfa = from_ast(parse_regex(regex))
+            dfa.matches(''.join(rng.choice(chars) for _ in range(1000)))
+            num_states = dfa.num_states()
+            dfa.matches(''.join(rng.choice(chars) for _ in range(5000)))
+            self.assertEqual(dfa.num_states(), num_states, regex)
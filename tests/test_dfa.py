@@ -0,0 +1,210 @@
+import unittest
+import nfa
+import dfa as dfa_
+from dfa import from_nfa, minimize
+from parser import parse_regex
+
+class _CountedStr(str):
+    '''A str that counts how many times its chars are read by index'''
+    def __getitem__(self, index):
+        self.reads += 1
+        return super().__getitem__(index)
+
+class TestDfa(unittest.TestCase):
+    def test_from_nfa_states(self):
+        dfa = from_nfa(nfa.from_ast(parse_regex('(a|b)*c')), minimized=False)
+        # Entry, after a, after b, after c, and the trap state reached on any other char
+        self.assertEqual(len(dfa.states()), 5)
+
+        dfa = from_nfa(nfa.from_ast(parse_regex('a*')))
+        self.assertEqual(len(dfa.states()), 2)
+
+    def test_from_nfa_large(self):
+        dfa = from_nfa(nfa.from_ast(parse_regex('(a|b)*a(a|b){8}')))
+        self.assertEqual(len([state for state in dfa.states() if state.is_accepting]), 2 ** 8)
+        self.assertTrue(dfa.matches('bbba' + 'ab' * 4))
+        self.assertFalse(dfa.matches('bbbb' + 'ab' * 4))
+
+    def test_from_nfa_on_unmatched_char(self):
+        dfa = from_nfa(nfa.from_ast(parse_regex('[^a]b|.c')))
+        self.assertTrue(dfa.matches('xb'))
+        self.assertTrue(dfa.matches('ac'))
+        self.assertTrue(dfa.matches('xc'))
+        self.assertFalse(dfa.matches('ab'))
+
+    def test_minimize(self):
+        dfa = minimize(from_nfa(nfa.from_ast(parse_regex('(a|b)*c')), minimized=False))
+        # Before c, after c and the trap state
+        self.assertEqual(len(dfa.states()), 3)
+        self.assertEqual(dfa.states_removed, 2)
+        self.assertTrue(dfa.matches('abbac'))
+        self.assertFalse(dfa.matches('abbacc'))
+
+        dfa = from_nfa(nfa.from_ast(parse_regex('\\w{2,5}@\\w+')))
+        self.assertEqual(len(dfa.states()), 9) # 0-5 word chars, after @, after @\w and the trap state
+        self.assertGreater(dfa.states_removed, 0)
+        self.assertTrue(dfa.matches('ab@c'))
+        self.assertTrue(dfa.matches('abcde@cd'))
+        self.assertFalse(dfa.matches('abcdef@cd'))
+        self.assertFalse(dfa.matches('a@cd'))
+
+    def test_minimize_on_unmatched_char(self):
+        # [^a] and . only differ on a, so must not be merged
+        dfa = from_nfa(nfa.from_ast(parse_regex('x[^a]|y.')))
+        self.assertTrue(dfa.matches('xb'))
+        self.assertTrue(dfa.matches('ya'))
+        self.assertFalse(dfa.matches('xa'))
+
+        # Both branches accept any char after their first char, so merge
+        dfa = from_nfa(nfa.from_ast(parse_regex('x.|y.')))
+        self.assertEqual(len(dfa.states()), 4)
+        self.assertTrue(dfa.matches('y\u1234'))
+
+    def test_minimize_already_minimal(self):
+        dfa = minimize(from_nfa(nfa.from_ast(parse_regex('a*'))))
+        self.assertEqual(len(dfa.states()), 2)
+        self.assertEqual(dfa.states_removed, 0)
+
+    def test_compile(self):
+        dfa = from_nfa(nfa.from_ast(parse_regex('(a|b)*c')))
+        compiled = dfa.compile()
+        self.assertIs(dfa.compile(), compiled)
+        self.assertEqual(compiled.num_states, 3)
+        self.assertEqual(len(compiled.table), compiled.num_states * len(compiled.alphabet))
+        self.assertEqual(compiled.entry, 0)
+        self.assertEqual(compiled.dead.count(True), 1)
+
+        self.assertTrue(compiled.matches('abbac'))
+        self.assertFalse(compiled.matches('abbacc'))
+        self.assertFalse(compiled.matches('abxac'))
+        self.assertFalse(compiled.matches(''))
+
+    def test_compiled_long_input(self):
+        compiled = from_nfa(nfa.from_ast(parse_regex('.+@.+\\..+'))).compile()
+        self.assertTrue(compiled.matches('a' * 10000 + '@' + 'b' * 10000 + '.com'))
+        self.assertFalse(compiled.matches('a' * 10000 + '@' + 'b' * 10000))
+
+    def test_find_longest_match(self):
+        compiled = from_nfa(nfa.from_ast(parse_regex('ab*'))).compile()
+        self.assertEqual(compiled.find_longest_match('xabbbx', 1), 5)
+        self.assertEqual(compiled.find_longest_match('xabbb', 1), 5)
+        self.assertIsNone(compiled.find_longest_match('xabbb', 0))
+
+    def test_find_subset_matches(self):
+        dfa = from_nfa(nfa.from_ast(parse_regex('a+b')))
+        self.assertEqual(dfa.find_subset_matches('aaaab'), ['aaaab'])
+        self.assertEqual(dfa.find_subset_matches('xaby aab'), ['ab', 'aab'])
+
+    def test_match_starts(self):
+        compiled = from_nfa(nfa.from_ast(parse_regex('ab*c|b'))).compile()
+        self.assertEqual(list(compiled.match_starts('xabbcbab')), [0, 1, 1, 1, 0, 1, 0, 1])
+        self.assertEqual(list(compiled.match_starts('')), [])
+
+    def test_find_match_spans(self):
+        compiled = from_nfa(nfa.from_ast(parse_regex('ab*c|b'))).compile()
+        self.assertEqual(compiled.find_match_spans('xabbcbab'), [(1, 5), (5, 6), (7, 8)])
+
+        # Empty matches are ignored, and matches don't overlap
+        compiled = from_nfa(nfa.from_ast(parse_regex('a*'))).compile()
+        self.assertEqual(compiled.find_match_spans('baab aaa'), [(1, 3), (5, 8)])
+        compiled = from_nfa(nfa.from_ast(parse_regex('..'))).compile()
+        self.assertEqual(compiled.find_match_spans('abcde'), [(0, 2), (2, 4)])
+
+    def test_find_match_spans_matches_brute_force(self):
+        for regex in ('a|ab|abc', '(a|b)*c', '[^a]b*', 'a.c|b', '(ab)*b?'):
+            compiled = from_nfa(nfa.from_ast(parse_regex(regex))).compile()
+            for s in ('', 'abcabc', 'bbbcab', 'aaaa', 'cabbbcbcb', 'xbyab', 'ababb'):
+                spans = []
+                start = 0
+                while start < len(s):
+                    end = compiled.find_longest_match(s, start)
+                    if end not in (None, start):
+                        spans.append((start, end))
+                        start = end
+                    else:
+                        start += 1
+                self.assertEqual(compiled.find_match_spans(s), spans, '{0} against {1}'.format(regex, s))
+
+    def test_find_match_spans_long_input(self):
+        compiled = from_nfa(nfa.from_ast(parse_regex('\\w+@\\w+\\.\\w+'))).compile()
+        s = 'ab cd ' * 50000 + 'email@address.com ' + 'ab@cd ' * 50000
+        self.assertEqual(compiled.find_match_spans(s), [(300000, 300017)])
+
+    def test_find_match_spans_linear(self):
+        # Every a is a match, but could start a longer one if a b came later, so scanning to the end from each a to
+        # rule it out would read the string quadratically many times
+        for regex in ('a(.*b)?', '[ac](.*b)?'):
+            compiled = dfa_.from_ast(parse_regex(regex)).compile()
+            for length in (1000, 4000):
+                s = _CountedStr('a' * length)
+                s.reads = 0
+                self.assertEqual(compiled.find_match_spans(s), [(i, i + 1) for i in range(length)])
+                self.assertLessEqual(s.reads, 5 * length, regex)
+
+    def test_too_many_reversed_states(self):
+        compiled = dfa_.from_ast(parse_regex('([ab]{12}b|c)*')).compile()
+        self.assertIsNone(compiled.reversed())
+        s = 'ab' * 6 + 'b' + 'cc' + 'a' * 12 + 'bb' + 'b' * 13 + 'xc'
+        spans = []
+        start = 0
+        while start < len(s):
+            end = compiled.find_longest_match(s, start)
+            if end not in (None, start):
+                spans.append((start, end))
+                start = end
+            else:
+                start += 1
+        self.assertEqual(compiled.find_match_spans(s), spans)
+        self.assertEqual(list(compiled.match_starts(s)), [int(any(start == i for start, _ in spans) or
+            compiled.find_longest_match(s, i) not in (None, i)) for i in range(len(s))])
+        self.assertTrue(compiled.search('xxcxx'))
+        self.assertTrue(dfa_.from_ast(parse_regex('([ab]{12}b|c)+')).compile().search('x' + 'a' * 12 + 'bx'))
+        self.assertFalse(dfa_.from_ast(parse_regex('([ab]{12}b|c)+')).compile().search('x' + 'a' * 12 + 'x'))
+
+    def test_search(self):
+        for regex in ('ab*c|b', 'b\\w*'):
+            compiled = from_nfa(nfa.from_ast(parse_regex(regex))).compile()
+            with_prefilter = dfa_.from_ast(parse_regex(regex)).compile()
+            for s in ('aabbbc', 'aax', '', 'xb'):
+                self.assertEqual(compiled.search(s), 'b' in s, '{0} against {1}'.format(regex, s))
+                self.assertEqual(with_prefilter.search(s), 'b' in s, '{0} against {1}'.format(regex, s))
+        self.assertTrue(dfa_.from_ast(parse_regex('a*')).compile().search(''))
+
+    def test_bytes(self):
+        compiled = dfa_.from_ast(parse_regex('\\w+@\\w+')).compile()
+        self.assertTrue(compiled.matches(b'me@host'))
+        self.assertFalse(compiled.matches(bytearray(b'me at host')))
+        self.assertEqual(compiled.find_match_spans(memoryview(b'a b@c d@e')), [(2, 5), (6, 9)])
+        self.assertTrue(compiled.search(b'x y@z'))
+        self.assertFalse(compiled.search(b'x y z'))
+
+    def test_utf8(self):
+        for regex in ('.', '[^a]', 'é+', '[α-ω]+b', '\\w+', '[^\\w]+', 'a.c', '[^é-ψ]*😀', 'café+', 'ψ😀.*'):
+            compiled = dfa_.from_ast(parse_regex(regex)).compile()
+            utf8 = dfa_.from_ast(parse_regex(regex), utf8=True).compile()
+            self.assertTrue(utf8.alphabet.utf8)
+            for s in ('', 'a', 'é', 'ééé', 'αβγb', 'abc', 'aéc', 'a😀c', 'x😀', 'ψ😀', 'a￿c', 'caféψ ωb'):
+                encoded = s.encode('utf-8')
+                self.assertEqual(utf8.matches(encoded), compiled.matches(s), '{0} against {1}'.format(regex, s))
+                self.assertEqual(utf8.search(encoded), compiled.search(s), '{0} against {1}'.format(regex, s))
+                self.assertEqual([bytes(match).decode('utf-8') for match in utf8.find_subset_matches(memoryview(encoded))],
+                    compiled.find_subset_matches(s), '{0} against {1}'.format(regex, s))
+
+    def test_literal_prefix(self):
+        compiled = dfa_.from_ast(parse_regex('abc(d|e)*')).compile()
+        for s in ('abc', 'abcdde', b'abcded', memoryview(b'abced')):
+            self.assertTrue(compiled.matches(s))
+        for s in ('', 'ab', 'abd', 'abcdf', b'xbcd', memoryview(b'abcx')):
+            self.assertFalse(compiled.matches(s))
+
+        compiled = dfa_.from_ast(parse_regex('ab\\.c')).compile()
+        self.assertTrue(compiled.matches('ab.c'))
+        self.assertTrue(compiled.matches(b'ab.c'))
+        self.assertFalse(compiled.matches('abxc'))
+
+    def test_utf8_invalid(self):
+        compiled = dfa_.from_ast(parse_regex('a.c'), utf8=True).compile()
+        self.assertFalse(compiled.matches(b'a\xffc'))
+        self.assertFalse(compiled.matches(b'a\xc3c')) # truncated é
+        self.assertFalse(compiled.matches(b'a\xed\xa0\x80c')) # encoded surrogate
+        self.assertRaises(ValueError, compiled.matches, 'abc')
@@ -1,6 +1,8 @@
 import unittest
 import nfa
 import dfa
+import derivative_dfa
+import lazy_dfa
 from adt import *
 from parser import parse_regex
 
@@ -9,7 +11,9 @@ class MultipleMethodsTester:
         self.regex = regex
         self.ast = parse_regex(regex)
         self.nfa = nfa.from_ast(self.ast)
-        self.dfa = dfa.from_nfa(self.nfa)
+        self.dfa = dfa.from_ast(self.ast)
+        self.derivative_dfa = derivative_dfa.from_ast(self.ast)
+        self.lazy_dfa = lazy_dfa.from_nfa(self.nfa)
         self.unittest = unittest
 
     def _failure_details(self, s, invert=False):
@@ -20,11 +24,15 @@ class MultipleMethodsTester:
         self.unittest.assertTrue(self.ast.matches(s), 'Derivative {0}'.format(self._failure_details(s)))
         self.unittest.assertTrue(self.nfa.matches(s), 'NFA {0}'.format(self._failure_details(s)))
         self.unittest.assertTrue(self.dfa.matches(s), 'DFA {0}'.format(self._failure_details(s)))
+        self.unittest.assertTrue(self.derivative_dfa.matches(s), 'Derivative DFA {0}'.format(self._failure_details(s)))
+        self.unittest.assertTrue(self.lazy_dfa.matches(s), 'Lazy DFA {0}'.format(self._failure_details(s)))
 
     def assert_not_matches(self, s):
         self.unittest.assertFalse(self.ast.matches(s), 'Derivative {0}'.format(self._failure_details(s, True)))
         self.unittest.assertFalse(self.nfa.matches(s), 'NFA {0}'.format(self._failure_details(s, True)))  
         self.unittest.assertFalse(self.dfa.matches(s), 'DFA {0}'.format(self._failure_details(s, True)))  
+        self.unittest.assertFalse(self.derivative_dfa.matches(s), 'Derivative DFA {0}'.format(self._failure_details(s, True)))
+        self.unittest.assertFalse(self.lazy_dfa.matches(s), 'Lazy DFA {0}'.format(self._failure_details(s, True)))
 
 class TestEndToEnd(unittest.TestCase):         
     def test_end_to_end_basic_email_address(self):
@@ -250,3 +258,19 @@ class TestEndToEnd(unittest.TestCase):
         tester.assert_matches('aaaa')
         tester.assert_matches('aaaaa')
         tester.assert_not_matches('aaaaaa')
+
+        tester = MultipleMethodsTester(self, '(ab|c){2,3}d')
+        tester.assert_not_matches('abd')
+        tester.assert_matches('abcd')
+        tester.assert_matches('ccabd')
+        tester.assert_not_matches('ccccd')
+
+    def test_end_to_end_large_quantifier(self):
+        ast = parse_regex('\\w{1,1000}')
+        self.assertEqual(ast, Repeat(parse_regex('\\w'), 1, 1000))
+        self.assertTrue(ast.matches('x' * 100))
+        self.assertFalse(ast.matches(''))
+
+        for method in [derivative_dfa.from_ast(ast), dfa.from_ast(ast)]:
+            self.assertTrue(method.matches('x' * 1000))
+            self.assertFalse(method.matches('x' * 1001))
@@ -0,0 +1,46 @@
+import unittest
+import os
+import tempfile
+import dfa
+import grep
+from parser import parse_regex
+
+class TestGrep(unittest.TestCase):
+    def scan_file(self, regex, contents):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(contents)
+        self.addCleanup(os.remove, f.name)
+        compiled = dfa.from_ast(parse_regex(regex)).compile()
+        return list(grep.scan_file(f.name, compiled)), list(grep.find_in_file(f.name, compiled))
+
+    def test_scan_file(self):
+        lines, matches = self.scan_file('\\w+@\\w+', b'me@host\nnone\n\nx a@b c@d\n')
+        self.assertEqual(lines, [(1, 0, [(0, 7)]), (4, 14, [(2, 5), (6, 9)])])
+        self.assertEqual(matches, [(1, 0, b'me@host'), (4, 16, b'a@b'), (4, 20, b'c@d')])
+
+    def test_scan_file_without_literal(self):
+        lines, matches = self.scan_file('[ab]+', b'xx\nab\nx\nb')
+        self.assertEqual(lines, [(2, 3, [(0, 2)]), (4, 8, [(0, 1)])])
+        self.assertEqual(matches, [(2, 3, b'ab'), (4, 8, b'b')])
+
+    def test_scan_file_skips_to_literal(self):
+        contents = b'nothing here\n' * 10000 + b'ERROR: refused\n' + b'nothing here\n' * 10000
+        lines, matches = self.scan_file('ERROR: .*', contents)
+        self.assertEqual(lines, [(10001, 130000, [(0, 14)])])
+        lines, matches = self.scan_file('absent', contents)
+        self.assertEqual(lines, [])
+
+    def test_scan_empty_file(self):
+        self.assertEqual(self.scan_file('a*', b''), ([], []))
+
+    def test_scan(self):
+        compiled = dfa.from_ast(parse_regex('b+')).compile()
+        self.assertEqual(list(grep.scan(b'abba\n\nb', compiled)), [(1, 0, [(1, 3)]), (3, 6, [(0, 1)])])
+
+    def test_scan_file_utf8(self):
+        compiled = dfa.from_ast(parse_regex('caf.|[α-ω]+'), utf8=True).compile()
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write('naïve café\nαβγ\n'.encode('utf-8'))
+        self.addCleanup(os.remove, f.name)
+        self.assertEqual(list(grep.find_in_file(f.name, compiled)), 
+            [(1, 7, 'café'.encode('utf-8')), (2, 13, 'αβγ'.encode('utf-8'))])
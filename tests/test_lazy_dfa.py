@@ -0,0 +1,37 @@
+import unittest
+import random
+import nfa
+from lazy_dfa import from_nfa
+from parser import parse_regex
+
+class TestLazyDfa(unittest.TestCase):
+    def test_matches(self):
+        dfa = from_nfa(nfa.from_ast(parse_regex('a(b|c)*d')))
+        self.assertTrue(dfa.matches('ad'))
+        self.assertTrue(dfa.matches('abcbd'))
+        self.assertFalse(dfa.matches('a'))
+        self.assertFalse(dfa.matches('abde'))
+        self.assertFalse(dfa.matches(''))
+
+    def test_states_built_on_demand(self):
+        dfa = from_nfa(nfa.from_ast(parse_regex('(a|b)*a(a|b){15}')))
+        self.assertEqual(dfa.num_states(), 2) # entry and trap
+        self.assertTrue(dfa.matches('a' * 16))
+        # The full DFA has over 2^16 states, but only those the input reached are built
+        self.assertLessEqual(dfa.num_states(), 18)
+
+    def test_bounded_cache(self):
+        nfa_ = nfa.from_ast(parse_regex('(a|b)*a(a|b){6}'))
+        dfa = from_nfa(nfa_, max_states=10)
+        random.seed(1)
+        for _ in range(50):
+            s = ''.join(random.choice('ab') for _ in range(random.randint(0, 30)))
+            self.assertEqual(dfa.matches(s), nfa_.matches(s), s)
+            self.assertLessEqual(dfa.num_states(), 10)
+        self.assertGreater(dfa.flushes, 0)
+        self.assertRaises(ValueError, from_nfa, nfa_, max_states=2)
+
+    def test_long_input(self):
+        dfa = from_nfa(nfa.from_ast(parse_regex('.+@.+\\..+')), max_states=4)
+        self.assertTrue(dfa.matches('a' * 10000 + '@' + 'b' * 10000 + '.com'))
+        self.assertFalse(dfa.matches('a' * 10000 + '@' + 'b' * 10000))
@@ -0,0 +1,61 @@
+import unittest
+import nfa
+import dfa
+from literals import from_ast, Literals
+from parser import parse_regex
+
+class TestLiterals(unittest.TestCase):
+    def assert_literals(self, regex, exact, prefix, suffix, required):
+        self.assertEqual(from_ast(parse_regex(regex)).literals, Literals(exact, prefix, suffix, required), regex)
+
+    def test_literals(self):
+        self.assert_literals('abc', 'abc', 'abc', 'abc', 'abc')
+        self.assert_literals('', '', '', '', '')
+        self.assert_literals('\\w+@\\w+\\.\\w+', None, '', '', '@')
+        self.assert_literals('ERROR: .*refused', None, 'ERROR: ', 'refused', 'ERROR: ')
+        self.assert_literals('a*xyz\\d', None, '', '', 'xyz')
+        self.assert_literals('(foo|fab)(bar|car)', None, 'f', 'ar', 'ar')
+        self.assert_literals('(ab|ab)c', 'abc', 'abc', 'abc', 'abc')
+        self.assert_literals('(a?)', None, '', '', '')
+        self.assert_literals('x(.y|zy)z', None, 'x', 'yz', 'yz')
+
+    def test_could_match(self):
+        prefilter = from_ast(parse_regex('ERROR: .*refused'))
+        self.assertTrue(prefilter.could_match('ERROR: connection refused'))
+        self.assertFalse(prefilter.could_match('WARN: connection refused'))
+        self.assertFalse(prefilter.could_match('ERROR: connection reset'))
+
+        prefilter = from_ast(parse_regex('abc'))
+        self.assertTrue(prefilter.could_match('abc'))
+        self.assertFalse(prefilter.could_match('abcabc'))
+
+    def test_could_find(self):
+        prefilter = from_ast(parse_regex('\\w+@\\w+'))
+        self.assertTrue(prefilter.could_find('me@host'))
+        self.assertFalse(prefilter.could_find('me at host'))
+
+    def test_candidate_starts(self):
+        self.assertIsNone(from_ast(parse_regex('\\w+@\\w+')).candidate_starts('a@b'))
+        prefilter = from_ast(parse_regex('ab+'))
+        self.assertEqual(list(prefilter.candidate_starts('abab xaab')), [0, 2, 7])
+        self.assertEqual(list(prefilter.candidate_starts('abab xaab', 1)), [2, 7])
+
+    def test_dfa_with_prefilter(self):
+        for regex in ('ab+', 'x\\w*y|xz', '[ab]c', '\\w+@\\w+', 'aa'):
+            with_prefilter = dfa.from_ast(parse_regex(regex)).compile()
+            without_prefilter = dfa.from_nfa(nfa.from_ast(parse_regex(regex))).compile()
+            self.assertIsNotNone(with_prefilter.prefilter)
+            for s in ('', 'abbb ab a', 'xyz xzy xabcy', 'a@b c@ @d', 'aaaaa', 'bcac'):
+                self.assertEqual(with_prefilter.find_match_spans(s), without_prefilter.find_match_spans(s), 
+                    '{0} against {1}'.format(regex, s))
+                self.assertEqual(with_prefilter.matches(s), without_prefilter.matches(s))
+
+    def test_bytes(self):
+        prefilter = from_ast(parse_regex('ERROR: .*refused'))
+        self.assertTrue(prefilter.could_match(b'ERROR: connection refused'))
+        self.assertFalse(prefilter.could_find(b'WARN: connection reset'))
+        self.assertEqual(list(prefilter.candidate_starts(b'ERROR: ERROR: ')), [0, 7])
+        # No byte is the char ☃, so no bytes can contain it
+        prefilter = from_ast(parse_regex('a☃'))
+        self.assertFalse(prefilter.could_find(b'a\xe2\x98\x83'))
+        self.assertEqual(list(prefilter.candidate_starts(b'a\xe2\x98\x83')), [])
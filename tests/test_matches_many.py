@@ -0,0 +1,50 @@
+import unittest
+import dfa
+import pattern
+from parser import parse_regex
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestMatchesMany(unittest.TestCase):
+    def assert_matches_many(self, compiled, strings):
+        results = compiled.matches_many(strings)
+        self.assertEqual(results.dtype, bool)
+        self.assertEqual(list(results), [compiled.matches(s) for s in strings])
+
+    def test_matches_many(self):
+        strings = ['', 'a', 'me@host.com', 'me@host', 'x' * 100 + '@y.z', '@.', 'a@b.c', 'é@ü.ß', 'a@b.c ']
+        for regex in ('\\w+@\\w+\\.\\w+', '[^@]*@.*', '', 'a*', '(ab|c){2,3}', '[α-ω]+'):
+            self.assert_matches_many(dfa.from_ast(parse_regex(regex)).compile(), strings)
+
+    def test_pattern(self):
+        self.assertEqual(list(pattern.compile('a+b').matches_many(['ab', 'aab', 'b', ''])), [True, True, False, False])
+
+    def test_empty(self):
+        compiled = dfa.from_ast(parse_regex('a+')).compile()
+        self.assertEqual(len(compiled.matches_many([])), 0)
+        self.assert_matches_many(compiled, ['', '', ''])
+
+    def test_bytes(self):
+        strings = [b'', b'ab', b'abab', bytearray(b'aba'), memoryview(b'abba'), b'\xff']
+        self.assert_matches_many(dfa.from_ast(parse_regex('(ab)*')).compile(), strings)
+
+        compiled = dfa.from_ast(parse_regex('é+.'), utf8=True).compile()
+        self.assert_matches_many(compiled, [s.encode('utf-8') for s in ('é', 'éé', 'ééx', 'é😀', 'x')])
+        self.assertRaises(ValueError, compiled.matches_many, ['é'])
+
+    def test_batches(self):
+        compiled = dfa.from_ast(parse_regex('(ab)*')).compile()
+        strings = ['ab' * (i % 7) + 'a' * (i % 3 == 0) for i in range(200)] + ['ab' * 5000]
+        original, dfa.MATCHES_MANY_MAX_CELLS = dfa.MATCHES_MANY_MAX_CELLS, 64
+        try:
+            self.assert_matches_many(compiled, strings)
+        finally:
+            dfa.MATCHES_MANY_MAX_CELLS = original
+
+    def test_batch_bounds(self):
+        self.assertEqual(list(dfa._batches([1, 2, 2, 10], 6)), [(0, 3), (3, 4)])
+        self.assertEqual(list(dfa._batches([0, 0, 0], 6)), [(0, 3)])
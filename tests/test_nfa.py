@@ -41,6 +41,25 @@ class TestNfa(unittest.TestCase):
         self.assertFalse(nfa.matches('aa'))
         self.assertFalse(nfa.matches('b'))
 
+    def test_matches_optional_zero_or_more(self):
+        # The Optional's skip mustn't be reachable after looping back through the ZeroOrMore
+        for regex in ('a(.*b)?', '(a*b)?', '(a*b)*', '(.*b){2,}'):
+            nfa = from_ast(parse_regex(regex))
+            for s in ('a', 'aa', 'ab', 'abab', 'aab', 'abaab', ''):
+                self.assertEqual(nfa.matches(s), parse_regex(regex).matches(s), '{0} against {1}'.format(regex, s))
+
+    def test_matches_repeat(self):
+        nfa = from_ast(Repeat(Char('a'), 2, 3))
+        self.assertFalse(nfa.matches('a'))
+        self.assertTrue(nfa.matches('aa'))
+        self.assertTrue(nfa.matches('aaa'))
+        self.assertFalse(nfa.matches('aaaa'))
+
+        nfa = from_ast(Repeat(Char('a'), 2, None))
+        self.assertFalse(nfa.matches('a'))
+        self.assertTrue(nfa.matches('aa'))
+        self.assertTrue(nfa.matches('aaaaaaa'))
+
     def test_matches_any_char(self):
         nfa = from_ast(AnyChar())
         self.assertTrue(nfa.matches('a'))
@@ -98,3 +117,20 @@ class TestNfa(unittest.TestCase):
         self.assertFalse(nfa.matches('c'))
         self.assertFalse(nfa.matches('cd'))
         self.assertFalse(nfa.matches('de'))
+
+    def test_matches_long_input(self):
+        nfa = from_ast(parse_regex('(a|b)*c'))
+        self.assertTrue(nfa.matches('ab' * 10000 + 'c'))
+        self.assertFalse(nfa.matches('ab' * 10000))
+
+    def test_matches_backtracking(self):
+        nfa = from_ast(parse_regex('(ab)?(cde)*'))
+        for s in ('', 'ab', 'cde', 'abcdecde', 'a', 'cd', 'abcdd'):
+            self.assertEqual(nfa.matches_backtracking(s), nfa.matches(s), s)
+
+    def test_epsilon_closure(self):
+        nfa = from_ast(parse_regex('a?b?'))
+        closure = nfa.epsilon_closure(nfa.entry)
+        self.assertIn(nfa.entry, closure)
+        self.assertIn(nfa.exit, closure)
+        self.assertTrue(closure <= nfa.states())
@@ -0,0 +1,64 @@
+import unittest
+import dfa
+import parallel
+import serialization
+from parser import parse_regex
+
+class TestParallel(unittest.TestCase):
+    def assert_same_matches(self, regex, s, chunk_sizes=(1, 2, 3, 7, 16)):
+        compiled = dfa.from_ast(parse_regex(regex)).compile()
+        expected = compiled.find_subset_matches(s)
+        for chunk_size in chunk_sizes:
+            self.assertEqual(parallel.find_subset_matches(s, compiled, workers=2, chunk_size=chunk_size), expected,
+                '{0} in chunks of {1}'.format(regex, chunk_size))
+
+    def test_matches_crossing_chunks(self):
+        text = 'the cat sat on a mat, at 10:45 on 2024-01-02; cats & mats!'
+        for regex in ('\\w+', '[a-z]+at', 'at', 'a.*t', '\\d+(:\\d+|-\\d+)*', '(ca|at|t )+', 'x', ' ?[ms]at'):
+            self.assert_same_matches(regex, text)
+
+    def test_ambiguous_starts(self):
+        # Where the reversed DFA's state at a chunk's end decides whether a match starts inside it
+        self.assert_same_matches('a+b', 'aaaaaaab aaaaa aaab')
+        self.assert_same_matches('(ab)+c', 'abababc ababa abc')
+
+    def test_worst_cases(self):
+        # A match that spans most chunks is found by scanning sequentially, which gives up part way through
+        self.assert_same_matches('[ab]+', 'x' + 'ab' * 100 + 'x' + 'ba' * 50)
+
+        # The reversed DFA's runs from states after an odd and an even number of a's never meet
+        compiled = dfa.from_ast(parse_regex('(aa)*b')).compile()
+        parallel._init_worker(serialization.dumps(compiled))
+        unconverged = parallel.MAX_UNCONVERGED // compiled.reversed().num_states
+        self.assertIsNone(parallel._reverse_scan('a' * (unconverged + 1)))
+        self.assertIsNotNone(parallel._reverse_scan('a' * unconverged))
+        s = 'a' * (3 * unconverged) + 'b'
+        self.assertEqual(parallel.find_match_spans(s, compiled, workers=2, chunk_size=unconverged * 2),
+            compiled.find_match_spans(s))
+
+    def test_too_many_reversed_states(self):
+        # A run from each of 2 ** 9 or 2 ** 13 reversed states would be slower than scanning s once, so no workers
+        # are started
+        def no_executor(*args, **kwargs):
+            raise AssertionError('started workers')
+        self.addCleanup(setattr, parallel, 'ProcessPoolExecutor', parallel.ProcessPoolExecutor)
+        parallel.ProcessPoolExecutor = no_executor
+        for regex in ('([ab]{8}b|c)*', '([ab]{12}b|c)*'):
+            compiled = dfa.from_ast(parse_regex(regex)).compile()
+            s = ('ab' * 6 + 'bc' + 'a' * 20 + 'xc') * 10
+            self.assertEqual(parallel.find_match_spans(s, compiled, workers=2, chunk_size=7),
+                compiled.find_match_spans(s))
+
+    def test_bytes(self):
+        compiled = dfa.from_ast(parse_regex('\\w+@\\w+'), utf8=True).compile()
+        s = 'mail é@x or me@host, yo@là'.encode('utf-8')
+        for chunk_size in (1, 4, 9):
+            self.assertEqual(parallel.find_match_spans(s, compiled, workers=2, chunk_size=chunk_size),
+                compiled.find_match_spans(s))
+            self.assertEqual(parallel.find_match_spans(memoryview(s), compiled, workers=2, chunk_size=chunk_size),
+                compiled.find_match_spans(s))
+
+    def test_small_input(self):
+        compiled = dfa.from_ast(parse_regex('b+')).compile()
+        self.assertEqual(parallel.find_subset_matches('abba', compiled), ['bb'])
+        self.assertEqual(parallel.find_subset_matches('', compiled, chunk_size=1), [])
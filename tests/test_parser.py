@@ -60,18 +60,59 @@ class TestParser(unittest.TestCase):
 
         self.assertEqual(
             parse_regex('a{15}'),
-            sequence_tree_from_regexes([Char('a')]*15),
+            Repeat(Char('a'), 15, 15),
             'Parse {15} quantifier'
         )
 
         self.assertEqual(
             parse_regex('a{15,}'),
-            sequence_tree_from_regexes([Char('a')]*15 + [ZeroOrMore(Char('a'))]),
+            Repeat(Char('a'), 15, None),
             'Parse {15,} quantifier'
         )
 
         self.assertEqual(
             parse_regex('a{15,17}'),
-            sequence_tree_from_regexes([Char('a')]*15 + [Optional(Char('a'))]*2),
+            Repeat(Char('a'), 15, 17),
             'Parse {15,17} quantifier'
         )
+
+        self.assertEqual(
+            parse_regex('a|b|c|d'),
+            or_tree_from_regexes([Char('a'), Char('b'), Char('c'), Char('d')]),
+            'Or of several terms'
+        )
+
+        self.assertEqual(
+            parse_regex('*a|+'),
+            Or(Literal('*a'), Char('+')),
+            'Quantifier chars with nothing to repeat'
+        )
+
+        self.assertEqual(parse_regex('(a|)()'), Or(Char('a'), Epsilon()), 'Empty terms')
+
+    def test_unbalanced_parentheses(self):
+        with self.assertRaises(ValueError):
+            parse_regex('(a(b)')
+        with self.assertRaises(ValueError):
+            parse_regex('a)b')
+
+    def test_large_patterns(self):
+        # Far more alternatives, nesting and factors than the recursion limit
+        keywords = ['k{0}x'.format(i) for i in range(5000)]
+        self.assertEqual(
+            parse_regex('|'.join(keywords)),
+            or_tree_from_regexes([char_sequence_from_str(keyword) for keyword in keywords])
+        )
+
+        self.assertEqual(parse_regex('(' * 5000 + 'a' + ')' * 5000), Char('a'))
+        self.assertEqual(parse_regex('ab' * 50000), Literal('ab' * 50000))
+
+    def test_literals(self):
+        self.assertEqual(parse_regex('abc'), Literal('abc'))
+        self.assertEqual(parse_regex('a\\.b[c]'), Literal('a.bc'), 'Escaped chars and one-char classes')
+        self.assertEqual(parse_regex('abc*'), Sequence(Literal('ab'), ZeroOrMore(Char('c'))), 'Quantifier on the last char')
+        self.assertEqual(
+            parse_regex('ab(cd)ef.g'),
+            Sequence(Sequence(Literal('abcdef'), AnyChar()), Char('g')),
+            'Groups of only chars are joined to the chars next to them'
+        )
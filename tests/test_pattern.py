@@ -0,0 +1,83 @@
+import unittest
+import pattern
+from parser import parse_regex
+from threading import Barrier, Thread
+
+class TestPattern(unittest.TestCase):
+    def setUp(self):
+        pattern.clear_cache()
+        pattern.set_cache_size(pattern.DEFAULT_CACHE_SIZE)
+        self.addCleanup(pattern.clear_cache)
+
+    def test_pattern(self):
+        email = pattern.compile('\\w+@\\w+\\.\\w+')
+        self.assertTrue(email.matches('me@host.com'))
+        self.assertFalse(email.matches('me@host'))
+        self.assertTrue(email.search('mail me@host.com now'))
+        self.assertEqual(email.find_match_spans('mail me@host.com now'), [(5, 16)])
+        self.assertEqual(email.find_subset_matches('a@b.c d@e.f'), ['a@b.c', 'd@e.f'])
+        self.assertTrue(pattern.compile('é+', utf8=True).matches('éé'.encode('utf-8')))
+
+    def test_cache(self):
+        a = pattern.compile('a+b')
+        self.assertIs(pattern.compile('a+b'), a)
+        self.assertIsNot(pattern.compile('a+b', utf8=True), a)
+        self.assertIsNot(pattern.compile('a+b', minimized=False), a)
+        self.assertEqual(pattern.cache_stats(), {'hits': 1, 'misses': 3, 'evictions': 0, 'size': 3, 'max_size': 512})
+
+    def test_lru_eviction(self):
+        pattern.set_cache_size(2)
+        a = pattern.compile('a')
+        pattern.compile('b')
+        self.assertIs(pattern.compile('a'), a) # b is now the least recently used
+        pattern.compile('c')
+        self.assertIs(pattern.compile('a'), a)
+        self.assertEqual(pattern.cache_stats(), {'hits': 2, 'misses': 3, 'evictions': 1, 'size': 2, 'max_size': 2})
+        pattern.compile('b')
+        self.assertEqual(pattern.cache_stats()['misses'], 4)
+
+        pattern.set_cache_size(0)
+        self.assertEqual(pattern.cache_stats()['size'], 0)
+        self.assertEqual(pattern.cache_stats()['evictions'], 4)
+        self.assertIsNot(pattern.compile('a'), a)
+        self.assertRaises(ValueError, pattern.set_cache_size, -1)
+
+    def test_threads(self):
+        cache = pattern.PatternCache(max_size=8)
+        regexes = ['a{0}b*'.format(i) for i in range(16)]
+        results = []
+
+        def compile_all():
+            for _ in range(5):
+                for regex in regexes:
+                    results.append(cache.compile(regex).matches(regex.replace('*', '')))
+
+        threads = [Thread(target=compile_all) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [True] * 4 * 5 * 16)
+        self.assertEqual(len(cache), 8)
+        self.assertEqual(cache.hits + cache.misses, 4 * 5 * 16)
+
+    def test_threads_share_nodes(self):
+        cache = pattern.PatternCache()
+        regexes = ['(x{0}|y[a-f]{{1,3}})+z{0}'.format(i) for i in range(40)]
+        results = []
+        barrier = Barrier(6)
+
+        def compile_all():
+            barrier.wait()
+            results.append([cache.compile(regex) for regex in regexes])
+
+        threads = [Thread(target=compile_all) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for compiled in results[1:]:
+            for a, b in zip(results[0], compiled):
+                self.assertIs(a, b)
+        for regex, compiled in zip(regexes, results[0]):
+            self.assertIs(compiled.ast, parse_regex(regex))
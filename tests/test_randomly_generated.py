@@ -2,6 +2,7 @@ import unittest
 import generators
 import nfa
 import dfa
+import derivative_dfa
 from parser import parse_regex
 from utils import constructor_str
 
@@ -17,6 +18,7 @@ class TestRandomlyGenerated(unittest.TestCase):
             ast = generators.ast()
             nfa_ = nfa.from_ast(ast)
             dfa_ = dfa.from_nfa(nfa_)
+            derivative_dfa_ = derivative_dfa.from_ast(ast)
             
             if PRINT_TESTS:
                 print('-----TEST: matching_str-----')
@@ -33,6 +35,9 @@ class TestRandomlyGenerated(unittest.TestCase):
                 self.assertTrue(dfa_.matches(matching_str), "Regex: '{0}' and String: '{1}' ".format(ast.to_regex(), matching_str) +
                     "were generated as a matching pair, but they were determined not to match by the DFA method.")
 
+                self.assertTrue(derivative_dfa_.matches(matching_str), "Regex: '{0}' and String: '{1}' ".format(ast.to_regex(), matching_str) +
+                    "were generated as a matching pair, but they were determined not to match by the derivative DFA method.")
+
     def test_to_regex(self):
         REGEX_TO_TEST = 1000
 
@@ -0,0 +1,50 @@
+import unittest
+import random
+import nfa
+import dfa
+from regex_set import from_regexes
+from parser import parse_regex
+
+class TestRegexSet(unittest.TestCase):
+    def test_matches(self):
+        regex_set = from_regexes(['a+b', 'ab*', '[a-c]+', 'x'])
+        self.assertEqual(regex_set.matches('ab'), frozenset([0, 1, 2]))
+        self.assertEqual(regex_set.matches('aab'), frozenset([0, 2]))
+        self.assertEqual(regex_set.matches('abbb'), frozenset([1, 2]))
+        self.assertEqual(regex_set.matches('x'), frozenset([3]))
+        self.assertEqual(regex_set.matches('xx'), frozenset())
+        self.assertEqual(regex_set.matches(''), frozenset())
+
+    def test_matches_empty(self):
+        regex_set = from_regexes(['a*', 'b?', 'c'])
+        self.assertEqual(regex_set.matches(''), frozenset([0, 1]))
+
+    def test_search(self):
+        regex_set = from_regexes(['\\w+@\\w+\\.\\w+', 'ERROR', '[0-9]{3}', 'x*'])
+        self.assertEqual(regex_set.search('contact me@host.com'), frozenset([0, 3]))
+        self.assertEqual(regex_set.search('ERROR 404'), frozenset([1, 2, 3]))
+        self.assertEqual(regex_set.search('ERRO 40'), frozenset([3]))
+        self.assertEqual(regex_set.search(''), frozenset([3]))
+
+    def test_one_dfa(self):
+        regex_set = from_regexes(['ab', 'ac', 'ad'])
+        # Entry, after a, after each of b, c and d, and the trap state
+        self.assertEqual(regex_set.compile().num_states, 6)
+
+    def test_matches_same_as_individual_regexes(self):
+        regexes = ['a(b|c)*', '[^a]b', '.c', '(ab)+', 'a?b?c?', '\\d+', 'abc']
+        regex_set = from_regexes(regexes)
+        dfas = [dfa.from_nfa(nfa.from_ast(parse_regex(regex))) for regex in regexes]
+        random.seed(2)
+        for _ in range(200):
+            s = ''.join(random.choice('abc1') for _ in range(random.randint(0, 5)))
+            self.assertEqual(regex_set.matches(s), frozenset(i for i, dfa_ in enumerate(dfas) if dfa_.matches(s)), s)
+            self.assertEqual(regex_set.search(s), 
+                frozenset(i for i, dfa_ in enumerate(dfas) if dfa_.find_subset_matches(s) or dfa_.matches('')), s)
+
+    def test_candidates(self):
+        regex_set = from_regexes(['\\w+@\\w+', 'ERROR: .*', '[xy]+', '[0-9]+ms'])
+        self.assertEqual(regex_set.candidates('all good'), set([2]))
+        self.assertEqual(regex_set.candidates('ERROR: took 20ms'), set([1, 2, 3]))
+        self.assertEqual(regex_set.candidates('@ms'), set([0, 2, 3]))
+        self.assertEqual(regex_set.search('@ms'), frozenset())
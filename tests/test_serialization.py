@@ -0,0 +1,56 @@
+import unittest
+import os
+import struct
+import tempfile
+import dfa
+import regex_set
+import serialization
+from parser import parse_regex
+
+class TestSerialization(unittest.TestCase):
+    def assert_same(self, loaded, compiled, strs):
+        self.assertEqual(list(loaded.table), list(compiled.table))
+        self.assertEqual(loaded.accepting, compiled.accepting)
+        self.assertEqual(loaded.dead, compiled.dead)
+        self.assertEqual(loaded.pattern_ids, compiled.pattern_ids)
+        self.assertEqual(loaded.alphabet.boundaries, compiled.alphabet.boundaries)
+        self.assertEqual(loaded.alphabet.utf8, compiled.alphabet.utf8)
+        self.assertEqual(loaded.prefilter.literals, compiled.prefilter.literals)
+        for s in strs:
+            self.assertEqual(loaded.matches(s), compiled.matches(s))
+            self.assertEqual(loaded.find_match_spans(s), compiled.find_match_spans(s))
+
+    def test_round_trip(self):
+        for regex in ('\\w+@\\w+\\.\\w+', '(a|b)*a(a|b){3}', 'ERROR: .*', '[^ab]', 'ሴ?x', ''):
+            compiled = dfa.from_ast(parse_regex(regex)).compile()
+            loaded = serialization.loads(serialization.dumps(compiled))
+            self.assert_same(loaded, compiled, ['', 'me@host.com', 'abaab', 'ERROR: x', 'cሴx', 'ሴx'])
+
+    def test_round_trip_utf8(self):
+        compiled = dfa.from_ast(parse_regex('caf.|[α-ω]+'), utf8=True).compile()
+        loaded = serialization.loads(bytearray(serialization.dumps(compiled)))
+        self.assertEqual(loaded.prefilter.encoding, 'utf-8')
+        self.assert_same(loaded, compiled, [s.encode('utf-8') for s in ('café', 'αβ', 'cafe', 'x αβ café')])
+
+    def test_round_trip_regex_set(self):
+        compiled = regex_set.from_regexes(['ab', 'a+', 'b']).compile()
+        loaded = serialization.loads(serialization.dumps(compiled))
+        self.assertEqual(loaded.pattern_ids, compiled.pattern_ids)
+        self.assertIsNone(loaded.prefilter)
+
+    def test_load(self):
+        compiled = dfa.from_ast(parse_regex('\\w+@\\w+')).compile()
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            pass
+        self.addCleanup(os.remove, f.name)
+        serialization.dump(compiled, f.name)
+        loaded = serialization.load(f.name)
+        self.assert_same(loaded, compiled, ['me@host', 'me at host', 'a@b c@d'])
+
+    def test_invalid(self):
+        data = serialization.dumps(dfa.from_ast(parse_regex('a+b')).compile())
+        self.assertRaises(ValueError, serialization.loads, b'RDF')
+        self.assertRaises(ValueError, serialization.loads, b'XDFA' + data[4:])
+        self.assertRaises(ValueError, serialization.loads, data[:4] + struct.pack('<H', 99) + data[6:])
+        self.assertRaises(ValueError, serialization.loads, data[:-1])
+        self.assertRaises(ValueError, serialization.loads, data + b'\0')
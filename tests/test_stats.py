@@ -0,0 +1,99 @@
+import unittest
+import derivative_dfa
+import dfa
+import nfa
+import pattern
+import stats
+from threading import Barrier, Thread
+from parser import parse_regex
+
+class TestStats(unittest.TestCase):
+    def test_pattern_stats(self):
+        compiled = pattern.Pattern('a+b', stats=True)
+        self.assertEqual(compiled.stats.counters, {'nfa_states': 8, 'epsilon_closure_calls': 4,
+            'dfa_states_built': 5, 'dfa_edges_built': 10, 'dfa_states': 4})
+        self.assertEqual(list(compiled.stats.seconds), ['parse', 'nfa_build', 'dfa_build', 'dfa_compile'])
+
+        self.assertTrue(compiled.matches('aaab'))
+        self.assertEqual(compiled.find_subset_matches('xab aab'), ['ab', 'aab'])
+        self.assertEqual(compiled.stats.counters['chars_scanned'], 11)
+        self.assertIn('match', compiled.stats.seconds)
+        self.assertIn('chars_scanned: 11', str(compiled.stats))
+
+    def test_disabled(self):
+        compiled = pattern.Pattern('a+b')
+        self.assertIsNone(compiled.stats)
+        self.assertTrue(compiled.matches('aaab'))
+        self.assertIsNone(stats.current())
+
+    def test_derivative_stats(self):
+        recorded = stats.Stats()
+        derivative_dfa_ = derivative_dfa.from_ast(parse_regex('a+b'))
+        with stats.recording(recorded):
+            derivative_dfa_.matches('aaab')
+            derivative_dfa_.matches('aab')
+            derivative_dfa_.matches('ac')
+        # a from the entry, and a and b after an a, are the only derivatives taken, the other 4 chars reuse them. ac
+        # is ruled out by the prefilter, as it has no b.
+        self.assertEqual(recorded.counters, {'chars_scanned': 9, 'derivative_calls': 3, 'derivative_cache_hits': 4})
+
+    def test_nfa_stats(self):
+        recorded = stats.Stats()
+        with stats.recording(recorded):
+            nfa_ = nfa.from_ast(parse_regex('ab'))
+            nfa_.matches('ab')
+        # ab is a Literal, a chain of 3 states
+        self.assertEqual(recorded.counters, {'nfa_states': 3, 'chars_scanned': 2, 'epsilon_closure_calls': 3})
+
+    def test_regex_stats(self):
+        recorded = stats.Stats()
+        with stats.recording(recorded):
+            parse_regex('a(b|c)*').matches('abcb')
+        self.assertEqual(recorded.counters, {'derivative_calls': 4})
+
+    def test_recorded_once_per_call(self):
+        regex = parse_regex('a(b|c)*')
+        engines = [regex.matches, nfa.from_ast(regex).matches, derivative_dfa.from_ast(regex).matches,
+            dfa.from_ast(regex).compile().matches, dfa.from_ast(regex).compile().find_match_spans]
+        for matches in engines:
+            adds = []
+            recorded = stats.Stats()
+            recorded.add = lambda counter, n=1: adds.append(counter)
+            with stats.recording(recorded):
+                matches('a' + 'bc' * 500)
+            self.assertLessEqual(len(adds), 3, matches)
+
+    def test_threads(self):
+        patterns = [pattern.Pattern('a+b', stats=True) for _ in range(6)]
+        current_after = []
+        barrier = Barrier(len(patterns))
+
+        def match(compiled):
+            barrier.wait()
+            for _ in range(300):
+                compiled.matches('aab')
+            current_after.append(stats.current())
+
+        threads = [Thread(target=match, args=(compiled,)) for compiled in patterns]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIsNone(stats.current())
+        self.assertEqual(current_after, [None] * len(patterns))
+        for compiled in patterns: # each recorded only its own matches
+            self.assertEqual(compiled.stats.counters['chars_scanned'], 300 * 3)
+
+    def test_recording_nests(self):
+        outer, inner = stats.Stats(), stats.Stats()
+        with stats.recording(outer):
+            with stats.recording(inner), stats.phase('inner'):
+                stats.add('counter', 2)
+            stats.add('counter')
+        self.assertIsNone(stats.current())
+        self.assertEqual(inner.counters, {'counter': 2})
+        self.assertEqual(list(inner.seconds), ['inner'])
+        self.assertEqual(outer.counters, {'counter': 1})
+        stats.add('counter') # not recording, so ignored
+        with stats.phase('ignored'):
+            pass
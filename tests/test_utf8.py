@@ -0,0 +1,45 @@
+import unittest
+import sys
+from itertools import chain
+import utf8
+from adt import *
+from parser import parse_regex
+
+class TestUtf8(unittest.TestCase):
+    def assert_encodes(self, start, end, code_points):
+        sequences = utf8.byte_sequences(start, end)
+        for code_point in code_points:
+            encoded = chr(code_point).encode('utf-8')
+            matching = [sequence for sequence in sequences if len(sequence) == len(encoded) and 
+                all(low <= byte <= high for byte, (low, high) in zip(encoded, sequence))]
+            self.assertEqual(len(matching), 1 if start <= code_point <= end else 0, hex(code_point))
+
+    def test_byte_sequences_all(self):
+        self.assertEqual(utf8.byte_sequences(0, sys.maxunicode), [
+            ((0x00, 0x7F),),
+            ((0xC2, 0xDF), (0x80, 0xBF)),
+            ((0xE0, 0xE0), (0xA0, 0xBF), (0x80, 0xBF)),
+            ((0xE1, 0xEC), (0x80, 0xBF), (0x80, 0xBF)),
+            ((0xED, 0xED), (0x80, 0x9F), (0x80, 0xBF)), # up to the surrogates
+            ((0xEE, 0xEF), (0x80, 0xBF), (0x80, 0xBF)),
+            ((0xF0, 0xF0), (0x90, 0xBF), (0x80, 0xBF), (0x80, 0xBF)),
+            ((0xF1, 0xF3), (0x80, 0xBF), (0x80, 0xBF), (0x80, 0xBF)),
+            ((0xF4, 0xF4), (0x80, 0x8F), (0x80, 0xBF), (0x80, 0xBF))])
+
+    def test_byte_sequences(self):
+        self.assertEqual(utf8.byte_sequences(ord('a'), ord('z')), [((ord('a'), ord('z')),)])
+        self.assertEqual(utf8.byte_sequences(0xE9, 0xE9), [((0xC3, 0xC3), (0xA9, 0xA9))])
+        self.assertEqual(utf8.byte_sequences(0xD800, 0xDFFF), [])
+        nearby = lambda code_point: range(max(code_point - 70, 0), min(code_point + 70, sys.maxunicode + 1))
+        for start, end in ((0x70, 0x90), (0x7F0, 0x810), (0x3B1, 0x3C9), (0xD000, 0xE100), (0xFFF0, 0x10010), 
+                (0x1F600, 0x1F64F), (0x1234, 0x56789)):
+            code_points = [code_point for code_point in chain(nearby(start), nearby(end), range(start, end + 1, 97))
+                if not 0xD800 <= code_point <= 0xDFFF]
+            self.assert_encodes(start, end, code_points)
+
+    def test_code_point_ranges(self):
+        self.assertEqual(utf8.code_point_ranges(Char('é')), [(0xE9, 0xE9)])
+        self.assertEqual(utf8.code_point_ranges(AnyChar()), [(0, sys.maxunicode)])
+        self.assertEqual(utf8.code_point_ranges(parse_regex('[a-cb-dx]')), [(ord('a'), ord('d')), (ord('x'), ord('x'))])
+        self.assertEqual(utf8.code_point_ranges(parse_regex('[^b-y]')), [(0, ord('a')), (ord('z'), sys.maxunicode)])
+        self.assertEqual(utf8.code_point_ranges(CharClass(True, [CharRange('\0', chr(sys.maxunicode))])), [])
@@ -0,0 +1,63 @@
+'''Lowers the chars a regex matches to the bytes of their UTF-8 encodings, so automata can match undecoded bytes'''
+import adt
+
+_SURROGATES = (0xD800, 0xDFFF) # can't be encoded in UTF-8
+_LAST_OF_LENGTH = (0x7F, 0x7FF, 0xFFFF) # the highest code point with a 1, 2 and 3 byte encoding
+
+def code_point_ranges(regex):
+    '''The sorted, non-overlapping, inclusive (start, end) ranges of code points a Char, AnyChar or CharClass matches'''
+    if type(regex) in (adt.Char, adt.AnyChar, adt.CharClass):
+        return list(regex.ranges)
+
+    raise ValueError("Can't find the code points of unknown type: {0}".format(regex))
+
+def encode(text):
+    '''The UTF-8 encoding of text, or None if it has a surrogate, which can't be encoded'''
+    try:
+        return text.encode('utf-8')
+    except UnicodeEncodeError:
+        return None
+
+def byte_sequences(start, end):
+    '''
+    Returns the UTF-8 encodings of the code points from start to end, inclusive, as a list of tuples of (low, high)
+    byte ranges. A string of bytes encodes one of the code points if and only if it's as long as one of the tuples, and
+    each of its bytes is in the range at the same position of that tuple. Surrogates have no encoding, so are skipped.
+    The code points are split wherever the length of their encoding changes, then wherever a continuation byte doesn't
+    run over all of 0x80-0xBF, until each range of bytes can be checked without looking at the others.
+    '''
+    sequences = []
+    to_split = [(start, end)]
+    while to_split:
+        start, end = to_split.pop()
+        if start > end:
+            continue
+
+        if start <= _SURROGATES[1] and end >= _SURROGATES[0]:
+            to_split.extend([(_SURROGATES[1] + 1, end), (start, _SURROGATES[0] - 1)])
+            continue
+
+        split_at = next((last for last in _LAST_OF_LENGTH if start <= last < end), None)
+        if split_at is not None:
+            to_split.extend([(split_at + 1, end), (start, split_at)])
+            continue
+
+        if end <= _LAST_OF_LENGTH[0]:
+            sequences.append(((start, end),))
+            continue
+
+        # Each continuation byte holds 6 bits. If start and end differ above the last i continuation bytes, those
+        # bytes have to run from 0x80 in start to 0xBF in end, else there'd be code points in between that don't match.
+        for i in range(1, 4):
+            mask = (1 << (6 * i)) - 1
+            if start & ~mask == end & ~mask:
+                continue
+            if start & mask != 0:
+                to_split.extend([((start | mask) + 1, end), (start, start | mask)])
+                break
+            if end & mask != mask:
+                to_split.extend([(end & ~mask, end), (start, (end & ~mask) - 1)])
+                break
+        else:
+            sequences.append(tuple(zip(chr(start).encode('utf-8'), chr(end).encode('utf-8'))))
+    return sequences
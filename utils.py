@@ -1,5 +1,7 @@
 import inspect
+import weakref
 from itertools import tee, filterfalse
+from threading import Lock
 
 def raise_if(boolean, message):
     if boolean:
@@ -24,17 +26,39 @@ def lpartition(iterable, predicate):
     trues, falses = partition(iterable, predicate)
     return list(trues), list(falses)
 
-class SingletonMixin:
-    value = None
+class HashConsMixin:
+    '''
+    Hash consing: structurally equal instances are the same object, so equality is an identity check and the hash is
+    computed once, on construction. Subclasses build instances with cls._intern(field=value, ...) instead of
+    super().__new__(cls); fields must be hashable and the instance must not be mutated afterwards. Safe to build
+    instances from several threads: creating one holds a lock, so two threads never make equal, distinct instances.
+    '''
+    _interned = weakref.WeakValueDictionary()
+    _lock = Lock()
+
     def __new__(cls):
-        if not cls.value:
-            cls.value = super().__new__(cls)
-        return cls.value
+        return cls._intern()
+
+    @classmethod
+    def _intern(cls, **fields):
+        key = (cls,) + tuple(fields.values())
+        self = HashConsMixin._interned.get(key)
+        if self is not None:
+            return self
+        with HashConsMixin._lock: # checked again, as another thread may have made it since
+            self = HashConsMixin._interned.get(key)
+            if self is None:
+                self = object.__new__(cls)
+                self.__dict__.update(fields)
+                self._hash = hash(key)
+                HashConsMixin._interned[key] = self
+        return self
 
-class ValueEqualityMixin:
-    '''Value equality instead of reference equality'''
     def __eq__(self, other):
-        return type(self) == type(other) and self.__dict__ == other.__dict__
+        return self is other
+
+    def __hash__(self):
+        return self._hash
 
 def constructor_str(obj):
     if type(obj) == str:
@@ -56,7 +80,7 @@ def constructor_str(obj):
             "as there's no way to reconstruct the values automatically. Error encountered on value: {0}".format(obj))
 
         arg_strs_no_def_vals = [s.split('=')[0] for s in arg_strs]
-        arg_values = [constructor_str(obj.__dict__[a]) for a in arg_strs_no_def_vals[1:]]
+        arg_values = [constructor_str(getattr(obj, a)) for a in arg_strs_no_def_vals[1:]]
         return '{0}({1})'.format(cls.__name__, ', '.join(arg_values))
 
 class DefaultDict(dict):